@@ -0,0 +1,169 @@
+import asyncio
+import threading
+from typing import Optional
+
+import grpc
+from google.protobuf import empty_pb2
+
+from .ShowShotsServiceHandler import ShowShotsServiceHandler
+from .ShowGameServiceHandler import ShowGameServiceHandler
+from ..compiled_protos import api_pb2, api_pb2_grpc
+
+
+class AsyncServer:
+    def __init__(
+            self,
+            show_shots_handler: Optional[ShowShotsServiceHandler],
+            show_games_handler: Optional[ShowGameServiceHandler],
+            address: str = "[::]:50051",
+            max_concurrent_rpcs: Optional[int] = None,
+            max_send_message_length: int = 64 * 1024 * 1024,
+            max_receive_message_length: int = 64 * 1024 * 1024,
+            compression: Optional[grpc.Compression] = None,
+    ):
+        self.show_shots_handler: Optional[ShowShotsServiceHandler] = show_shots_handler
+        self.show_game_handler: Optional[ShowGameServiceHandler] = show_games_handler
+
+        self.address = address
+        self.max_concurrent_rpcs = max_concurrent_rpcs
+        self.max_send_message_length = max_send_message_length
+        self.max_receive_message_length = max_receive_message_length
+        self.compression = compression
+        self.port: Optional[int] = None
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._server: Optional[grpc.aio.Server] = None
+
+        self.CueCanvasService_instance = self.CueCanvasService(self)
+
+    class CueCanvasService(api_pb2_grpc.CueCanvasAPIServicer):
+        def __init__(self, outer_instance):
+            self.outer_instance = outer_instance
+
+        async def ShowShots(self, request: api_pb2.ShowShotsRequest, context: grpc.aio.ServicerContext):
+            handler = self.outer_instance.show_shots_handler
+            if handler is None:
+                await context.abort(grpc.StatusCode.UNIMPLEMENTED, "No shots viewer is running")
+
+            table_state = request.packedTableState if request.HasField("packedTableState") else request.tableState
+            await self._run_blocking(handler.publish_shots, request.shots, table_state)
+            return empty_pb2.Empty()
+
+        async def ShowGames(self, request: api_pb2.ShowGamesRequest, context: grpc.aio.ServicerContext):
+            handler = await self._get_game_handler(context)
+            await self._run_blocking(handler.publish_games, request.games)
+            return empty_pb2.Empty()
+
+        async def StreamGames(self, request_iterator, context: grpc.aio.ServicerContext):
+            handler = await self._get_appending_game_handler(context)
+            turns: list[api_pb2.GameTurn] = []
+            accepted_games = 0
+
+            async for request in request_iterator:
+                games: list[api_pb2.Game] = []
+
+                if request.HasField("game"):
+                    games.append(request.game)
+                if request.HasField("turn"):
+                    turns.append(request.turn)
+                if request.endGame and turns:
+                    games.append(api_pb2.Game(turnHistory=turns))
+                    turns = []
+
+                if games:
+                    await self._publish_appended_games(handler, games)
+                accepted_games += len(games)
+
+                yield api_pb2.StreamGamesAck(acceptedGames=accepted_games)
+
+            # Turns left over when the stream ends form a last game, acked like every other one
+            if turns:
+                await self._publish_appended_games(handler, [api_pb2.Game(turnHistory=turns)])
+                yield api_pb2.StreamGamesAck(acceptedGames=accepted_games + 1)
+
+        async def ShowLiveTurns(self, request_iterator, context: grpc.aio.ServicerContext):
+            handler = await self._get_appending_game_handler(context)
+
+            async for request in request_iterator:
+                await self._run_blocking(handler.publish_live_turn, request.turn, request.newGame)
+            return empty_pb2.Empty()
+
+        async def _get_game_handler(self, context: grpc.aio.ServicerContext) -> ShowGameServiceHandler:
+            handler = self.outer_instance.show_game_handler
+            if handler is None:
+                await context.abort(grpc.StatusCode.UNIMPLEMENTED, "No game viewer is running")
+            return handler
+
+        async def _get_appending_game_handler(self, context: grpc.aio.ServicerContext) -> ShowGameServiceHandler:
+            handler = await self._get_game_handler(context)
+            if not handler.accepts_appended_games():
+                await context.abort(grpc.StatusCode.FAILED_PRECONDITION,
+                                    "Games can not be appended to an indexed archive")
+            return handler
+
+        @staticmethod
+        async def _run_blocking(func, *args):
+            # A RenderProcess handler waits on its shared memory ring, which must not stall the event loop
+            return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+        @staticmethod
+        async def _publish_appended_games(handler: ShowGameServiceHandler, games: list[api_pb2.Game]):
+            # Polling keeps the event loop free for other calls while the viewer catches up
+            while not handler.publish_appended_games(games, timeout=0):
+                await asyncio.sleep(0.01)
+
+    def start(self):
+        if self._thread is not None:
+            raise Exception("Server is already running!")
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="AsyncServer", daemon=True)
+        self._thread.start()
+
+        asyncio.run_coroutine_threadsafe(self._start_server(), self._loop).result()
+        print(f"Listening on {self.address}, port {self.port}")
+
+    def stop(self, grace: Optional[float] = None):
+        if self._thread is None:
+            return
+
+        asyncio.run_coroutine_threadsafe(self._server.stop(grace), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+        self._thread = None
+        self._loop = None
+        self._server = None
+
+    def serve_shots_display(self):
+        self.start()
+        try:
+            self.show_shots_handler.start_server_window()
+        finally:
+            self.stop()
+
+    def serve_game_display(self):
+        self.start()
+        try:
+            self.show_game_handler.start_server_window()
+        finally:
+            self.stop()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    async def _start_server(self):
+        self._server = grpc.aio.server(
+            options=[
+                ("grpc.max_send_message_length", self.max_send_message_length),
+                ("grpc.max_receive_message_length", self.max_receive_message_length),
+            ],
+            maximum_concurrent_rpcs=self.max_concurrent_rpcs,
+            compression=self.compression,
+        )
+        api_pb2_grpc.add_CueCanvasAPIServicer_to_server(self.CueCanvasService_instance, self._server)
+        self.port = self._server.add_insecure_port(self.address)
+        await self._server.start()
@@ -0,0 +1,322 @@
+import multiprocessing
+import struct
+import threading
+from collections import deque
+from typing import Optional, Union
+
+from ..compiled_protos import api_pb2
+from ..GameArchive import IndexedGameArchive
+from ..SharedMemoryRing import SharedMemoryRing
+from ..ShotTrajectory import ShotTrajectory
+from ..TableStateCodec import AnyTableState
+from .ShowGameServiceHandler import ShowGameServiceHandler
+from .TurnPreSimulator import TurnPreSimulator
+
+_GAMES_BEGIN = 0
+_GAME = 1
+_GAMES_END = 2
+_APPENDED_GAME = 3
+_ARCHIVE = 4
+_LIVE_TURN = 5
+_SHOTS = 6
+_TRAJECTORY = 7
+_STOP = 8
+
+
+def _render_main(handler_type: type, handler_kwargs: dict, ring_name: str, shown_game):
+    ring = SharedMemoryRing.attach(ring_name)
+    handler = handler_type(**handler_kwargs)
+
+    reader = threading.Thread(target=_read_channel, args=(ring, handler, shown_game), name="RenderChannel",
+                              daemon=True)
+    reader.start()
+    handler.start_server_window()
+
+
+def _report_shown_game(handler, shown_game, generation: int):
+    # Tells the parent which game is on screen, it pre-simulates a window of games from there
+    if not isinstance(handler, ShowGameServiceHandler) or handler.active_game_idx is None:
+        return
+
+    with shown_game.get_lock():
+        shown_game[0] = generation
+        shown_game[1] = handler.active_game_idx
+
+
+def _read_channel(ring: SharedMemoryRing, handler, shown_game):
+    generation = 0
+    games: list[api_pb2.Game] = []
+    # Filled here as trajectories arrive, the handler swaps it in along with the games of its generation
+    trajectories: dict = {}
+
+    while True:
+        message = ring.read(0.05)
+        _report_shown_game(handler, shown_game, generation)
+        if message is None:
+            continue
+
+        kind, body = message[0], message[1:]
+
+        if kind == _GAMES_BEGIN:
+            generation = struct.unpack("<I", body)[0]
+            games = []
+            trajectories = {}
+        elif kind == _GAME:
+            games.append(api_pb2.Game.FromString(body))
+        elif kind == _GAMES_END:
+            handler.publish_games(games, trajectories)
+        elif kind == _APPENDED_GAME:
+            handler.publish_appended_games([api_pb2.Game.FromString(body)])
+        elif kind == _ARCHIVE:
+            generation, cache_size = struct.unpack_from("<II", body)
+            trajectories = {}
+            handler.publish_games(IndexedGameArchive(body[8:].decode(), cache_size), trajectories)
+        elif kind == _LIVE_TURN:
+            request = api_pb2.LiveTurnRequest.FromString(body)
+            handler.publish_live_turn(request.turn, request.newGame)
+        elif kind == _SHOTS:
+            request = api_pb2.ShowShotsRequest.FromString(body)
+            table_state = request.packedTableState if request.HasField("packedTableState") else request.tableState
+            handler.publish_shots(request.shots, table_state)
+        elif kind == _TRAJECTORY:
+            trajectory_generation, game_idx, turn_idx = struct.unpack_from("<III", body)
+            if trajectory_generation == generation:
+                trajectories[(game_idx, turn_idx)] = ShotTrajectory.from_bytes(body[12:])
+        elif kind == _STOP:
+            break
+
+    ring.close()
+
+
+class RenderProcess:
+    # Stands in for a ShowGameServiceHandler or ShowShotsServiceHandler, the handler itself and its
+    # p5 window live in a child process. Updates travel as protobuf and raw array bytes through a
+    # shared memory ring. Games are pre-simulated here, the same window of games the handler would
+    # pre-simulate around the game the child shows, so the child only has to draw.
+    PUMP_INTERVAL = 0.05
+
+    def __init__(
+            self,
+            handler_type: type,
+            ring_capacity: int = 64 * 1024 * 1024,
+            pre_simulate: bool = True,
+            pre_simulation_workers: Optional[int] = None,
+            write_timeout: float = 5.0,
+            **handler_kwargs,
+    ):
+        self.write_timeout: float = write_timeout
+
+        self._handler_type = handler_type
+        self._handler_kwargs = handler_kwargs
+        if pre_simulate and handler_type is ShowGameServiceHandler:
+            self._handler_kwargs["pre_simulate"] = False
+
+        self._context = multiprocessing.get_context("spawn")
+        self._ring = SharedMemoryRing.create(ring_capacity)
+        self._ring_lock = threading.Lock()
+        self._process: Optional[multiprocessing.Process] = None
+        # Generation and index of the game the child shows, written by the child
+        self._shown_game = self._context.Array("i", [0, -1])
+
+        self._generation = 0
+        self._game_count = 0
+        self._games: list[api_pb2.Game] = []
+        self._window_game_idx: Optional[int] = None
+        self._showing_archive = False
+        self._live_game_idx: Optional[int] = None
+        self._pre_simulator: Optional[TurnPreSimulator] = (
+            TurnPreSimulator(pre_simulation_workers, self._queue_trajectory) if pre_simulate else None
+        )
+
+        self._unsent_trajectories: deque = deque()
+        self._pump_wakeup = threading.Event()
+        self._pump: Optional[threading.Thread] = None
+
+    def start(self):
+        # Spawned rather than forked, the child must not inherit the server's threads or gRPC state
+        self._process = self._context.Process(
+            target=_render_main, args=(self._handler_type, self._handler_kwargs, self._ring.name, self._shown_game),
+            daemon=True,
+        )
+        self._process.start()
+
+        if self._pre_simulator:
+            self._pump = threading.Thread(target=self._run_pump, name="RenderChannelPump", daemon=True)
+            self._pump.start()
+
+    def start_server_window(self):
+        self.start()
+        self.join()
+
+    def join(self):
+        self._process.join()
+        with self._ring_lock:
+            self._ring.close()
+        self._pump_wakeup.set()
+
+    def stop(self):
+        if self._process is not None and self._process.is_alive():
+            with self._ring_lock:
+                self._write(_STOP, b"")
+            self._process.terminate()
+        self.join()
+
+    def publish_games(self, games: Union[list[api_pb2.Game], IndexedGameArchive]) -> bool:
+        with self._ring_lock:
+            # The child only shows games once GAMES_END arrives, a publish cut short leaves it on the old ones
+            self._generation += 1
+
+            if isinstance(games, IndexedGameArchive):
+                # The child opens the archive itself, this process has no further use for it
+                game_count = len(games)
+                body = struct.pack("<II", self._generation, games.cache_size) + games.path.encode()
+                games.close()
+                if not self._write(_ARCHIVE, body):
+                    return False
+                self._published([], game_count, True)
+                return True
+
+            if not self._write(_GAMES_BEGIN, struct.pack("<I", self._generation)):
+                return False
+            for game in games:
+                if not self._write(_GAME, game.SerializeToString()):
+                    return False
+            if not self._write(_GAMES_END, b""):
+                return False
+            self._published(list(games), len(games), False)
+            return True
+
+    def _published(self, games: list[api_pb2.Game], game_count: int, showing_archive: bool):
+        self._games = games
+        self._game_count = game_count
+        self._showing_archive = showing_archive
+        self._live_game_idx = None
+        self._window_game_idx = None
+
+        if self._pre_simulator:
+            self._pre_simulator.reset()
+            self._unsent_trajectories.clear()
+            if self._games:
+                self._pre_simulate_window(0)
+
+    def accepts_appended_games(self) -> bool:
+        return not self._showing_archive
+
+    def publish_appended_games(self, games: list[api_pb2.Game], timeout: Optional[float] = None) -> bool:
+        messages = [bytes((_APPENDED_GAME,)) + game.SerializeToString() for game in games]
+        if not self._ring_lock.acquire(timeout=-1 if timeout is None else timeout):
+            return False
+
+        try:
+            if self._ring.closed:
+                return False
+            if self._showing_archive:
+                print(f"{len(games)} appended games dropped, an indexed archive is shown")
+                return True
+
+            # Written as one batch, a caller retrying must not see half its games appended
+            while not self._ring.write_all(messages, 0.5 if timeout is None else timeout):
+                if timeout is not None or not self._is_child_alive():
+                    return False
+
+            self._games.extend(games)
+            self._game_count += len(games)
+            if self._pre_simulator:
+                # Like the handler, the first games loaded are shown right away
+                self._pre_simulate_window(0 if self._window_game_idx is None else self._window_game_idx)
+        finally:
+            self._ring_lock.release()
+
+        return True
+
+    def publish_live_turn(self, turn: api_pb2.GameTurn, new_game: bool = False) -> bool:
+        body = api_pb2.LiveTurnRequest(turn=turn, newGame=new_game).SerializeToString()
+
+        with self._ring_lock:
+            # Mirrors the child, which appends a game of its own for every live game and drops turns on an archive
+            if self._showing_archive:
+                print("Live turn dropped, an indexed archive is shown")
+                return False
+            if not self._write(_LIVE_TURN, body):
+                return False
+            if new_game or self._live_game_idx is None:
+                # An empty placeholder keeps game indices in step with the child, live turns are not pre-simulated
+                self._games.append(api_pb2.Game())
+                self._live_game_idx = self._game_count
+                self._game_count += 1
+            return True
+
+    def publish_shots(self, shot_trees: list[api_pb2.Shot], table_state: AnyTableState) -> bool:
+        request = api_pb2.ShowShotsRequest(shots=shot_trees)
+        if isinstance(table_state, api_pb2.PackedTableState):
+            request.tableState.SetInParent()
+            request.packedTableState.CopyFrom(table_state)
+        else:
+            request.tableState.CopyFrom(table_state)
+        body = request.SerializeToString()
+
+        with self._ring_lock:
+            return self._write(_SHOTS, body)
+
+    def _pre_simulate_window(self, game_idx: int):
+        # Called with the ring lock held, games behind the window already went to the child
+        self._window_game_idx = game_idx
+        last_game_idx = min(game_idx + ShowGameServiceHandler.PRE_SIMULATION_WINDOW, len(self._games))
+
+        self._pre_simulator.retain_games(game_idx, last_game_idx)
+        for window_game_idx in range(game_idx, last_game_idx):
+            if not self._pre_simulator.has_game(window_game_idx):
+                self._pre_simulator.append_games([self._games[window_game_idx]], window_game_idx)
+
+    def _queue_trajectory(self, game_idx: int, turn_idx: int, trajectory: ShotTrajectory):
+        # Runs on the pre-simulator's callback thread, which must never wait, the pump sends it
+        self._unsent_trajectories.append((self._generation, game_idx, turn_idx, trajectory))
+        self._pump_wakeup.set()
+
+    def _run_pump(self):
+        while not self._ring.closed:
+            self._pump_wakeup.wait(RenderProcess.PUMP_INTERVAL)
+            self._pump_wakeup.clear()
+
+            self._follow_shown_game()
+            self._send_trajectories()
+
+    def _follow_shown_game(self):
+        with self._shown_game.get_lock():
+            generation, game_idx = self._shown_game[:]
+
+        with self._ring_lock:
+            if generation == self._generation and game_idx >= 0 and game_idx != self._window_game_idx:
+                self._pre_simulate_window(game_idx)
+
+    def _send_trajectories(self):
+        while self._unsent_trajectories:
+            generation, game_idx, turn_idx, trajectory = self._unsent_trajectories[0]
+
+            with self._ring_lock:
+                if self._ring.closed:
+                    return
+
+                # A turn of older games or of a game the window has moved past is of no use to the child
+                if generation == self._generation and self._pre_simulator.get(game_idx, turn_idx) is trajectory:
+                    header = struct.pack("<III", generation, game_idx, turn_idx)
+                    # Left queued while the ring is full, the next pass retries it
+                    if not self._ring.write(bytes((_TRAJECTORY,)) + header + trajectory.to_bytes(), 0):
+                        return
+
+            self._unsent_trajectories.popleft()
+
+    def _write(self, kind: int, body: bytes) -> bool:
+        # Called with the ring lock held. Bounded, a child that stops reading for write_timeout
+        # costs the message rather than the caller's thread.
+        if self._ring.closed:
+            return False
+        if self._ring.write(bytes((kind,)) + body, self.write_timeout):
+            return True
+
+        if self._is_child_alive():
+            print(f"Message of kind {kind} dropped, the viewer did not keep up")
+        return False
+
+    def _is_child_alive(self) -> bool:
+        return self._process is not None and self._process.is_alive()
@@ -8,6 +8,7 @@ from concurrent import futures
 from .ShowShotsServiceHandler import ShowShotsServiceHandler
 from .ShowGameServiceHandler import ShowGameServiceHandler
 from ..compiled_protos import api_pb2, api_pb2_grpc
+from ..GameArchive import GameArchiveReader, IndexedGameArchive, IndexedGameArchiveWriter
 
 
 class Server:
@@ -22,14 +23,57 @@ class Server:
             self.outer_instance = outer_instance
 
         def ShowShots(self, request: api_pb2.ShowShotsRequest, context):
-            self.outer_instance.show_shots_handler.update_shots_trees(request.shots)
-            self.outer_instance.show_shots_handler.update_table_state(request.tableState)
+            table_state = request.packedTableState if request.HasField("packedTableState") else request.tableState
+            self.outer_instance.show_shots_handler.publish_shots(request.shots, table_state)
             return empty_pb2.Empty()
 
         def ShowGames(self, request: api_pb2.ShowGamesRequest, context):
-            self.outer_instance.show_game_handler.update_games(request.games)
+            self.outer_instance.show_game_handler.publish_games(request.games)
             return empty_pb2.Empty()
 
+        def StreamGames(self, request_iterator, context):
+            self._check_accepts_appended_games(context)
+            turns: list[api_pb2.GameTurn] = []
+            accepted_games = 0
+
+            for request in request_iterator:
+                games: list[api_pb2.Game] = []
+
+                if request.HasField("game"):
+                    games.append(request.game)
+                if request.HasField("turn"):
+                    turns.append(request.turn)
+                if request.endGame and turns:
+                    games.append(api_pb2.Game(turnHistory=turns))
+                    turns = []
+
+                if games and not self._publish_appended_games(games, context):
+                    return
+                accepted_games += len(games)
+
+                yield api_pb2.StreamGamesAck(acceptedGames=accepted_games)
+
+            # Turns left over when the stream ends form a last game, acked like every other one
+            if turns and self._publish_appended_games([api_pb2.Game(turnHistory=turns)], context):
+                yield api_pb2.StreamGamesAck(acceptedGames=accepted_games + 1)
+
+        def ShowLiveTurns(self, request_iterator, context):
+            self._check_accepts_appended_games(context)
+            for request in request_iterator:
+                self.outer_instance.show_game_handler.publish_live_turn(request.turn, request.newGame)
+            return empty_pb2.Empty()
+
+        def _check_accepts_appended_games(self, context):
+            if not self.outer_instance.show_game_handler.accepts_appended_games():
+                context.abort(grpc.StatusCode.FAILED_PRECONDITION, "Games can not be appended to an indexed archive")
+
+        def _publish_appended_games(self, games: list[api_pb2.Game], context) -> bool:
+            # Holding back the ack until the viewer has room is the flow control, the client waits on it
+            while not self.outer_instance.show_game_handler.publish_appended_games(games, timeout=0.5):
+                if not context.is_active():
+                    return False
+            return True
+
     def serve_shots_display(self):
         server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
         api_pb2_grpc.add_CueCanvasAPIServicer_to_server(self.CueCanvasService_instance, server)
@@ -51,24 +95,48 @@ class Server:
         server.wait_for_termination()
 
     def serve_loaded_games(self, show_game_request_binary_file_path: str):
-        show_games_request = self._read_protobuf_from_file(show_game_request_binary_file_path)
-        self._set_interval(lambda: self.show_game_handler.update_games(show_games_request.games), 1.5)
+        # Indexed archives are opened in place, a ShowGamesRequest file is streamed game by game
+        with open(show_game_request_binary_file_path, "rb") as f:
+            is_indexed = f.read(len(IndexedGameArchiveWriter.MAGIC)) == IndexedGameArchiveWriter.MAGIC
+
+        if is_indexed:
+            self.serve_indexed_archive(show_game_request_binary_file_path)
+        else:
+            self._serve_stream(GameArchiveReader(show_game_request_binary_file_path, show_games_request=True))
+
+    def serve_streamed_games(self, game_archive_file_path: str, batch_size: int = 64, batch_interval: float = 0.25):
+        self._serve_stream(GameArchiveReader(game_archive_file_path), batch_size, batch_interval)
+
+    def _serve_stream(self, reader: GameArchiveReader, batch_size: int = 64, batch_interval: float = 0.25):
+        reader_thread = threading.Thread(
+            target=self._stream_archive, args=(reader, batch_size, batch_interval), daemon=True
+        )
+        reader_thread.start()
         self.show_game_handler.start_server_window()
 
-    @staticmethod
-    def _set_interval(func, sec):
-        t = threading.Timer(sec, func)
-        t.start()
-        return t
+    def serve_indexed_archive(self, indexed_archive_file_path: str, cache_size: int = 32):
+        archive = IndexedGameArchive(indexed_archive_file_path, cache_size)
+        print(f"Opened archive with {len(archive)} games")
+        self.show_game_handler.publish_games(archive)
+        self.show_game_handler.start_server_window()
+
+    def _stream_archive(self, reader: GameArchiveReader, batch_size: int, batch_interval: float):
+        batch: list[api_pb2.Game] = []
+        published = 0
+        last_publish = time.monotonic()
+
+        for game in reader:
+            batch.append(game)
 
-    @staticmethod
-    def _read_protobuf_from_file(filename) -> api_pb2.ShowGamesRequest:
-        # Read the bytes from the file
-        with open(filename, "rb") as f:
-            protobuf_bytes = f.read()
+            # The first game goes out on its own so the viewer can start while the rest is decoded
+            if published == 0 or len(batch) >= batch_size or time.monotonic() - last_publish > batch_interval:
+                self.show_game_handler.publish_appended_games(batch)
+                published += len(batch)
+                batch = []
+                last_publish = time.monotonic()
 
-        # Parse the bytes into a Protocol Buffers object
-        protobuf_message = api_pb2.ShowGamesRequest()
-        protobuf_message.ParseFromString(protobuf_bytes)
+        if batch:
+            self.show_game_handler.publish_appended_games(batch)
+            published += len(batch)
 
-        return protobuf_message
+        print(f"Finished streaming {published} games")
@@ -1,16 +1,33 @@
-from typing import Tuple
+import queue
+from collections import deque
+from concurrent import futures
+from typing import Tuple, Union
 from p5 import *
 import fastfiz as ff
+import numpy as np
 from ..compiled_protos import api_pb2
 import os
 import time
 from sys import platform
 
 from fastfiz_renderer.GameTable import GameTable
+from fastfiz_renderer.HeadlessRenderer import HeadlessRenderer
+from fastfiz_renderer.ScreenshotWriter import ScreenshotWriter
+from .StateHandoff import StateHandoff
+from .TurnPreSimulator import TurnPreSimulator
+from .TurnTableCache import TurnTableCache, TurnTable
+from ..GameArchive import IndexedGameArchive
+from ..ShotCache import ShotCache
+from ..ShotTrajectory import ShotTrajectory
+from ..TableStateCodec import AnyTableState, TableStateCodec
 
 
 class ShowGameServiceHandler:
-    _instance = None
+    GAME_JUMP = 10
+    PRE_SIMULATION_WINDOW = 2
+    PREFETCH_TURNS = 3
+    BULK_SCREENSHOTS_PER_FRAME = 2
+    APPENDED_BATCHES_PER_FRAME = 8
 
     def __init__(
             self,
@@ -22,65 +39,82 @@ class ShowGameServiceHandler:
             auto_play: bool = False,
             shot_speed_factor: int = 1,
             screenshot_dir: str = ".",
+            pre_simulate: bool = True,
+            pre_simulation_workers: Optional[int] = None,
+            shot_cache: Optional[ShotCache] = None,
+            max_pending_appends: int = 32,
     ):
-        if ShowGameServiceHandler._instance is None:
-            self._game_table: Optional[GameTable] = None
-
-            self._renderer = "skia"
-            self._mac_mode: bool = platform == "darwin" and self._renderer == "skia"
-            self._window_pos: Tuple[int, int] = window_pos
-            self._frames_per_second: int = frames_per_second
-            self._scaling: int = scaling
-            self._horizontal_mode: bool = horizontal_mode
-            self._stroke_mode: bool = False
-            self._flipped: bool = flipped
-            self._auto_play: bool = auto_play
-            self._shot_speed_factor: int = shot_speed_factor
-
-            self._ss_dir: str = screenshot_dir
-            self._ss_buffer: Optional[p5.core.graphics.Graphics] = None
-            self._ss_scaling: int = 2000
-
-            self._games: list[api_pb2.Game] = []
-            self._active_game_idx: Optional[int] = None
-            self._turn_history: list[api_pb2.GameTurn] = []
-            self._active_turn_idx: Optional[int] = None
-
-            self._table_state: Optional[ff.TableState] = None
-            self._org_table_state: Optional[api_pb2.TableState] = None
-            self._highlighted_ball: Optional[str] = None
-            self._highlighted_pocket: Optional[str] = None
-            self._shot_params: Optional[api_pb2.ShotParams] = None
-
-            self._shot_available: bool = False
-
-            ShowGameServiceHandler._instance = self
-        else:
-            raise Exception("This class is a singleton!")
+        self._game_table: Optional[GameTable] = None
+
+        self._renderer = "skia"
+        self._mac_mode: bool = platform == "darwin" and self._renderer == "skia"
+        self._window_pos: Tuple[int, int] = window_pos
+        self._frames_per_second: int = frames_per_second
+        self._scaling: int = scaling
+        self._horizontal_mode: bool = horizontal_mode
+        self._stroke_mode: bool = False
+        self._flipped: bool = flipped
+        self._auto_play: bool = auto_play
+        self._shot_speed_factor: int = shot_speed_factor
+
+        self._ss_scaling: int = 2000
+        self._screenshot_writer = ScreenshotWriter(screenshot_dir, self._ss_scaling, horizontal_mode)
+
+        self._games: Union[list[api_pb2.Game], IndexedGameArchive] = []
+        self._active_game_idx: Optional[int] = None
+        self._turn_history: list[api_pb2.GameTurn] = []
+        self._active_turn_idx: Optional[int] = None
+
+        self._table_state: Optional[ff.TableState] = None
+        self._org_table_state: Optional[api_pb2.TableState] = None
+        self._highlighted_ball: Optional[str] = None
+        self._highlighted_pocket: Optional[str] = None
+        self._shot_params: Optional[api_pb2.ShotParams] = None
+
+        self._shot_available: bool = False
+        self._games_handoff: StateHandoff[Tuple[Union[Tuple[api_pb2.Game, ...], IndexedGameArchive], dict]] = (
+            StateHandoff()
+        )
+        self._appended_games: queue.Queue = queue.Queue(maxsize=max_pending_appends)
+        self._shot_cache: ShotCache = shot_cache or ShotCache()
+        self._pre_simulator: Optional[TurnPreSimulator] = (
+            TurnPreSimulator(pre_simulation_workers) if pre_simulate else None
+        )
+        self._turn_tables = TurnTableCache(self._build_turn_table)
+        self._precomputed_trajectories: dict[Tuple[int, int], ShotTrajectory] = {}
+
+        self._live_turns: queue.SimpleQueue = queue.SimpleQueue()
+        self._live_game_idx: Optional[int] = None
+        self._live_pending: deque = deque()
+        self._live_queued: deque = deque()
+        self._live_latencies: list[float] = []
+
+        self._bulk_screenshots: deque = deque()
+
+    @property
+    def active_game_idx(self) -> Optional[int]:
+        return self._active_game_idx
 
     def start_server_window(self):
         self._game_table = GameTable.from_table_state(
-            ff.TableState(), self._shot_speed_factor
+            ff.TableState(), self._shot_speed_factor, self._frames_per_second
         )
 
         width = int(self._game_table.width * self._scaling)
         length = int(self._game_table.length * self._scaling)
 
-        ss_width = int(self._game_table.width * self._ss_scaling)
-        ss_length = int(self._game_table.length * self._ss_scaling)
-
         if self._horizontal_mode:
             width, length = length, width
-            ss_width, ss_length = ss_length, ss_width
 
         def _setup():
             size(width, length)
-            self._ss_buffer = create_graphics(ss_width, ss_length)
             ellipseMode(CENTER)
             if not self._stroke_mode:
                 noStroke()
 
         def _draw():
+            self._apply_published_games()
+            self._render_bulk_screenshots()
             background(255)
             self._game_table.update(None)
             self._game_table.draw(
@@ -100,6 +134,10 @@ class ShowGameServiceHandler:
                 self._handle_shift_turn(True)
             elif event.key == "LEFT":
                 self._handle_shift_turn(False)
+            elif event.key == "PAGEUP":
+                self._handle_jump_games(self.GAME_JUMP)
+            elif event.key == "PAGEDOWN":
+                self._handle_jump_games(-self.GAME_JUMP)
             elif event.key == "f" or event.key == "F":
                 self._stroke_mode = not self._stroke_mode
             elif event.key == "a" or event.key == "A":
@@ -107,12 +145,19 @@ class ShowGameServiceHandler:
             elif event.key == "UP":
                 self._handle_shoot()
             elif event.key == "s" or event.key == "S":
-                self._handle_screenshot()
+                if not self._handle_screenshot():
+                    print("Screenshot queue is full, screenshot skipped")
+            elif event.key == "b" or event.key == "B":
+                self._handle_bulk_screenshot()
             elif event.key == "r" or event.key == "R":
-                self.update_table_state(self._org_table_state)
+                self.update_table_state(self._org_table_state, self._active_turn_key())
+            elif event.key == "c" or event.key == "C":
+                print(self._shot_cache.stats())
+            elif event.key == "l" or event.key == "L":
+                print(self.live_latency_stats())
             elif event.key in ["1", "2", "3", "4", "5", "6"]:
                 self._shot_speed_factor = self._get_shot_speed_factor(event.key)
-                self._game_table._shot_speed_factor = self._shot_speed_factor
+                self._game_table.set_shot_speed_factor(self._shot_speed_factor)
 
         run(
             renderer=self._renderer,
@@ -125,6 +170,67 @@ class ShowGameServiceHandler:
             window_title="Cue Canvas Server",
         )
 
+    def render_games_headless(
+            self,
+            games: Optional[list[api_pb2.Game]] = None,
+            output_dir: Optional[str] = None,
+            max_frames: Optional[int] = None,
+    ) -> list[np.ndarray]:
+        auto_play = self._auto_play
+        self._auto_play = False
+
+        if games is not None:
+            self.update_games(games)
+
+        table = self._game_table or GameTable.from_table_state(
+            ff.TableState(), self._shot_speed_factor, self._frames_per_second
+        )
+        renderer = HeadlessRenderer.for_table(table, self._scaling, self._horizontal_mode)
+        frames: list[np.ndarray] = []
+        frame_number = 0
+
+        def render_frame():
+            nonlocal frame_number
+            renderer.advance_frame(self._game_table, self._shot_speed_factor, self._frames_per_second)
+            renderer.clear()
+            self._game_table.update(None)
+            self._game_table.draw(
+                self._scaling,
+                self._horizontal_mode,
+                self._flipped,
+                self._stroke_mode,
+                1 if self._stroke_mode else 4,
+                [self._highlighted_ball],
+                [self._highlighted_pocket],
+                self._shot_params,
+                canvas=renderer.canvas
+            )
+            renderer.collect(frames, output_dir, f"frame_{frame_number:06d}.png")
+            frame_number += 1
+            return max_frames is None or frame_number < max_frames
+
+        try:
+            for game_idx in range(len(self._games)):
+                self._active_game_idx = game_idx
+                self._pre_simulate_window()
+                self._turn_history = self._get_game(game_idx).turnHistory
+                print(f"Game {self._active_game_idx + 1} / {len(self._games)}")
+
+                for turn_idx in range(len(self._turn_history)):
+                    self._active_turn_idx = turn_idx
+                    self._load_active_turn()
+                    if not render_frame():
+                        return frames
+
+                    self._handle_shoot(lambda: None)
+                    while not self._game_table.is_idle():
+                        if not render_frame():
+                            return frames
+        finally:
+            self._auto_play = auto_play
+
+        return frames
+
     @staticmethod
     def _get_shot_speed_factor(key):
         if key == "1":
@@ -142,10 +248,9 @@ class ShowGameServiceHandler:
         else:
             return 1
 
-    def _handle_screenshot(self):
-        os.makedirs(self._ss_dir, exist_ok=True)
-
-        self._ss_buffer.background(255)
+    def _handle_screenshot(self) -> bool:
+        ss_buffer = self._screenshot_writer.get_buffer(self._game_table)
+        ss_buffer.background(255)
 
         self._game_table.draw(
             self._ss_scaling,
@@ -156,10 +261,72 @@ class ShowGameServiceHandler:
             [self._highlighted_ball],
             [self._highlighted_pocket],
             self._shot_params,
-            canvas=self._ss_buffer.renderer
+            canvas=ss_buffer.renderer,
+            use_static_cache=False
         )
 
-        save_canvas(os.path.join(self._ss_dir, time.strftime("%Y-%m-%d_%T") + ".png"), self._ss_buffer)
+        return self._screenshot_writer.capture()
+
+    def _handle_bulk_screenshot(self):
+        if not self._turn_history:
+            return
+        if self._bulk_screenshots:
+            print(f"{len(self._bulk_screenshots)} screenshots of the previous batch are still pending")
+            return
+
+        prefix = time.strftime("%Y-%m-%d_%T")
+        for turn_idx, turn in enumerate(self._turn_history):
+            self._bulk_screenshots.append(
+                (f"{prefix}_game_{self._active_game_idx + 1}_turn_{turn_idx + 1:03d}.png", turn)
+            )
+
+        print(f"Queued screenshots of {len(self._turn_history)} turns")
+
+    def _render_bulk_screenshots(self):
+        # A few turns per frame keeps the window responsive, a full writer queue defers the rest to later frames
+        for _ in range(self.BULK_SCREENSHOTS_PER_FRAME):
+            if not self._bulk_screenshots or not self._screenshot_writer.has_room():
+                return
+
+            file_name, turn = self._bulk_screenshots.popleft()
+            highlighted_ball, highlighted_pocket = self._get_turn_targets(turn)
+            game_table = GameTable.from_table_state(
+                self._to_ff_table_state(TableStateCodec.table_state_before(turn)), self._shot_speed_factor
+            )
+
+            ss_buffer = self._screenshot_writer.get_buffer(game_table)
+            ss_buffer.background(255)
+
+            game_table.draw(
+                self._ss_scaling,
+                self._horizontal_mode,
+                self._flipped,
+                self._stroke_mode,
+                5 if self._stroke_mode else 10,
+                [highlighted_ball],
+                [highlighted_pocket],
+                turn.gameShot.shotParams,
+                canvas=ss_buffer.renderer,
+                use_static_cache=False
+            )
+
+            if not self._screenshot_writer.capture(file_name):
+                self._bulk_screenshots.appendleft((file_name, turn))
+                return
+
+            if not self._bulk_screenshots:
+                print("Bulk screenshots done")
+
+    @staticmethod
+    def _get_turn_targets(turn: api_pb2.GameTurn) -> Tuple[Optional[str], Optional[str]]:
+        if turn.turnType != "TT_BREAK":
+            # Recorded games without called targets leave them empty
+            return turn.gameShot.ballTarget or None, turn.gameShot.pocketTarget or None
+        return None, None
+
+    @staticmethod
+    def _to_ff_table_state(table_state: AnyTableState) -> ff.TableState:
+        return TableStateCodec.to_ff_table_state(table_state)
 
     def _handle_shift_turn(self, is_next):
         if self._turn_history:
@@ -174,21 +341,17 @@ class ShowGameServiceHandler:
                 else:
                     self._handle_shift_game(False)
 
-            turn = self._turn_history[self._active_turn_idx]
+            self._load_active_turn()
 
-            if turn.turnType != "TT_BREAK":
-                self._highlighted_ball = turn.gameShot.ballTarget
-                self._highlighted_pocket = self._turn_history[
-                    self._active_turn_idx
-                ].gameShot.pocketTarget
-            else:
-                self._highlighted_ball = None
-                self._highlighted_pocket = None
-            self._shot_params = turn.gameShot.shotParams
-            print(
-                f"{self._active_turn_idx + 1} / {len(self._turn_history)} - {turn.agentName} - {turn.gameShot.decision} - {turn.turnType} - {turn.shotResult}"
-            )
-            self.update_table_state(turn.tableStateBefore)
+    def _load_active_turn(self):
+        turn = self._turn_history[self._active_turn_idx]
+
+        self._highlighted_ball, self._highlighted_pocket = self._get_turn_targets(turn)
+        self._shot_params = turn.gameShot.shotParams
+        print(
+            f"{self._active_turn_idx + 1} / {len(self._turn_history)} - {turn.agentName} - {turn.gameShot.decision} - {turn.turnType} - {turn.shotResult}"
+        )
+        self.update_table_state(TableStateCodec.table_state_before(turn), self._active_turn_key())
 
     def _handle_shift_game(self, is_next):
         if self._games:
@@ -207,12 +370,235 @@ class ShowGameServiceHandler:
                         len(self._games[self._active_game_idx].turnHistory) - 1
                 )
 
-            game = self._games[self._active_game_idx]
+            self._load_active_game()
+
+    def _handle_jump_games(self, offset: int):
+        if self._games:
+            self.jump_to((self._active_game_idx + offset) % len(self._games))
+
+    def jump_to(self, game_idx: int, turn_idx: int = 0):
+        if not 0 <= game_idx < len(self._games):
+            raise Exception(f"Game {game_idx} does not exist!")
+
+        self._active_game_idx = game_idx
+        self._active_turn_idx = turn_idx
+        self._load_active_game()
+
+    def _load_active_game(self):
+        self._evict_outside_archive_window()
+        self._pre_simulate_window()
+
+        game = self._get_game(self._active_game_idx)
+        if not 0 <= self._active_turn_idx < len(game.turnHistory):
+            self._active_turn_idx = 0
+
+        print(f"Game {self._active_game_idx + 1} / {len(self._games)}")
+        self.update_turn_history(game.turnHistory)
+
+    def _get_game(self, game_idx: int) -> api_pb2.Game:
+        # Delta encoded games are only expanded once they are actually looked at
+        game = self._games[game_idx]
+        TableStateCodec.expand_delta_game(game)
+        return game
+
+    def _pre_simulate_window(self):
+        # Only the games from the active one on are handed to the pre-simulator, so loading a large
+        # batch costs nothing up front and the window is topped up as playback moves on
+        if not self._pre_simulator or self._active_game_idx is None:
+            return
+
+        last_game_idx = min(self._active_game_idx + self.PRE_SIMULATION_WINDOW, len(self._games))
+        for game_idx in range(self._active_game_idx, last_game_idx):
+            if not self._pre_simulator.has_game(game_idx):
+                self._pre_simulator.append_games([self._games[game_idx]], game_idx)
+
+    def _evict_outside_archive_window(self):
+        # An archive can be browsed without end, trajectories are only kept for the games its LRU cache could hold
+        if not isinstance(self._games, IndexedGameArchive) or self._active_game_idx is None:
+            return
+
+        first_game_idx = max(self._active_game_idx - self._games.cache_size, 0)
+        last_game_idx = self._active_game_idx + self._games.cache_size
+        if self._pre_simulator:
+            self._pre_simulator.retain_games(first_game_idx, last_game_idx)
+
+        for key in list(self._precomputed_trajectories):
+            if not first_game_idx <= key[0] < last_game_idx:
+                self._precomputed_trajectories.pop(key, None)
+
+    def publish_games(self, games: Union[list[api_pb2.Game], IndexedGameArchive],
+                      precomputed_trajectories: Optional[dict[Tuple[int, int], ShotTrajectory]] = None):
+        # Precomputed trajectories belong to these games, they are swapped in together on the render thread
+        replaced = self._games_handoff.publish((
+            games if isinstance(games, IndexedGameArchive) else tuple(games),
+            {} if precomputed_trajectories is None else precomputed_trajectories,
+        ))
+        # An archive replaced before the render thread took it is never shown, the same archive may be published again
+        replaced_games = replaced[0] if replaced is not None else None
+        if (isinstance(replaced_games, IndexedGameArchive) and replaced_games is not games
+                and replaced_games is not self._games):
+            replaced_games.close()
+
+    def accepts_appended_games(self) -> bool:
+        # An indexed archive is read only, RPCs check this up front so appended and live games are not silently lost
+        return not isinstance(self._games, IndexedGameArchive)
+
+    def publish_appended_games(self, games: list[api_pb2.Game], timeout: Optional[float] = None) -> bool:
+        # Blocks while the render thread is behind, which is what pushes back on fast producers
+        try:
+            self._appended_games.put(tuple(games), timeout=timeout)
+        except queue.Full:
+            return False
+        return True
+
+    def _apply_published_games(self):
+        published = self._games_handoff.take()
+        if published is not None:
+            self.update_games(*published)
+
+        appended: list[api_pb2.Game] = []
+        for _ in range(self.APPENDED_BATCHES_PER_FRAME):
+            try:
+                appended.extend(self._appended_games.get_nowait())
+            except queue.Empty:
+                break
+        if appended:
+            self.append_games(appended)
+
+        self._apply_live_turns()
+
+    def publish_live_turn(self, turn: api_pb2.GameTurn, new_game: bool = False):
+        self._live_turns.put((turn, new_game, time.perf_counter()))
+
+    def live_latency_stats(self) -> str:
+        if not self._live_latencies:
+            return "No live turns animated yet"
+
+        latencies = np.array(self._live_latencies) * 1000
+        return (f"Live turns: {len(latencies)}, receipt to first frame {latencies.mean():.1f} ms mean, "
+                f"{np.percentile(latencies, 95):.1f} ms p95, {latencies.max():.1f} ms max")
+
+    def _apply_live_turns(self):
+        while not self._live_turns.empty():
+            self._receive_live_turn(*self._live_turns.get())
+
+        # Turns are animated in the order they arrived, a turn still simulating holds back the ones behind it
+        while self._live_pending:
+            turn_idx, received_at, pending = self._live_pending[0]
+            if isinstance(pending, futures.Future):
+                if not pending.done():
+                    break
+                trajectory = None if pending.cancelled() or pending.exception() else pending.result()
+            else:
+                trajectory = pending
+
+            self._live_pending.popleft()
+            self._animate_live_turn(turn_idx, received_at, trajectory)
+
+    def _receive_live_turn(self, turn: api_pb2.GameTurn, new_game: bool, received_at: float):
+        if not self.accepts_appended_games():
+            print("Live turn dropped, an indexed archive is shown")
+            return
+
+        if new_game or self._live_game_idx is None:
+            self._start_live_game()
+
+        turn_history = self._games[self._live_game_idx].turnHistory
+        turn_history.append(turn)
+        turn_idx = len(turn_history) - 1
+
+        if turn.gameShot.decision == "DEC_CONCEDE":
+            return
+
+        table_state = TableStateCodec.to_arrays(TableStateCodec.table_state_before(turn))
+        sp = turn.gameShot.shotParams
+        shot_params = (sp.a, sp.b, sp.theta, sp.phi, sp.v)
+
+        if self._pre_simulator:
+            pending = self._pre_simulator.submit_turn(self._live_game_idx, turn_idx, table_state, shot_params)
+        else:
+            pending = self._shot_cache.execute(
+                TableStateCodec.to_ff_table_state(table_state), ff.ShotParams(*shot_params)
+            )
+        self._live_pending.append((turn_idx, received_at, pending))
+
+    def _start_live_game(self):
+        self.append_games([api_pb2.Game()])
+
+        self._live_game_idx = len(self._games) - 1
+        self._live_pending.clear()
+        self._live_queued.clear()
+        self._active_game_idx = self._live_game_idx
+        self._active_turn_idx = 0
+        self._turn_history = self._games[self._live_game_idx].turnHistory
+        print(f"Live game {self._live_game_idx + 1} started")
+
+    def _animate_live_turn(self, turn_idx: int, received_at: float, trajectory: Optional[ShotTrajectory]):
+        # Turns keep arriving while the viewer is elsewhere, they are only animated on the live game
+        if trajectory is None or self._active_game_idx != self._live_game_idx:
+            return
+
+        sp = self._turn_history[turn_idx].gameShot.shotParams
+        params = ff.ShotParams(sp.a, sp.b, sp.theta, sp.phi, sp.v)
+
+        if self._game_table.is_idle():
+            self._live_queued.clear()
+            self._active_turn_idx = turn_idx
+            self._load_active_turn()
+            self._live_latencies.append(time.perf_counter() - received_at)
+
+        self._game_table.add_trajectory(params, trajectory, self._handle_live_turn_finished)
+        self._live_queued.append((turn_idx, received_at))
+        self._shot_available = False
+        self._shot_params = None
+
+    def _handle_live_turn_finished(self):
+        self._live_queued.popleft()
+        if not self._live_queued:
+            return
+
+        # A queued turn may start from a different layout than the last one ended in, e.g. ball in hand
+        turn_idx, received_at = self._live_queued[0]
+        turn = self._turn_history[turn_idx]
+        self._active_turn_idx = turn_idx
+        self._highlighted_ball, self._highlighted_pocket = self._get_turn_targets(turn)
+        self._game_table.set_ball_states(TableStateCodec.to_ff_table_state(TableStateCodec.table_state_before(turn)))
+        self._live_latencies.append(time.perf_counter() - received_at)
+
+    def append_games(self, games: list[api_pb2.Game]):
+        if not self.accepts_appended_games():
+            print(f"{len(games)} appended games dropped, an indexed archive is shown")
+            return
+
+        first_game_idx = len(self._games)
+        if not isinstance(self._games, list):
+            self._games = list(self._games)
+        self._games.extend(games)
+
+        if first_game_idx == 0 and self._games:
+            self._active_game_idx = 0
+            self._active_turn_idx = 0
             print(f"Game {self._active_game_idx + 1} / {len(self._games)}")
-            self.update_turn_history(game.turnHistory)
+            self.update_turn_history(self._get_game(0).turnHistory)
+        else:
+            print(f"{len(self._games)} games loaded")
+
+        self._pre_simulate_window()
+
+    def update_games(self, games: Union[list[api_pb2.Game], IndexedGameArchive],
+                     precomputed_trajectories: Optional[dict[Tuple[int, int], ShotTrajectory]] = None):
+        if isinstance(self._games, IndexedGameArchive) and self._games is not games:
+            self._games.close()
 
-    def update_games(self, games: list[api_pb2.Game]):
         self._games = games
+        self._precomputed_trajectories = {} if precomputed_trajectories is None else precomputed_trajectories
+        self._turn_tables.clear()
+        self._live_game_idx = None
+        self._live_pending.clear()
+        self._live_queued.clear()
+        if self._pre_simulator:
+            self._pre_simulator.reset()
+
         if self._games:
             self._active_game_idx = 0
             self._active_turn_idx = 0
@@ -220,34 +606,55 @@ class ShowGameServiceHandler:
             self._highlighted_pocket = None
             self._shot_params = None
 
-            game = self._games[self._active_game_idx]
-            print(f"Game {self._active_game_idx + 1} / {len(self._games)}")
-            self.update_turn_history(game.turnHistory)
+            self._load_active_game()
 
     def update_turn_history(self, turn_history: list[api_pb2.GameTurn]):
         self._turn_history = turn_history
         if turn_history:
             turn = self._turn_history[self._active_turn_idx]
             self._shot_params = turn.gameShot.shotParams
-            self.update_table_state(turn.tableStateBefore)
+            self.update_table_state(TableStateCodec.table_state_before(turn), self._active_turn_key())
 
             if self._auto_play:
                 self._handle_shoot()
             # print(f"{self._active_turn_idx + 1} / {len(self._turn_history)} - {turn.agentName} - {turn.gameShot.decision} - {turn.turnType} - {turn.shotResult}")
 
-    def update_table_state(self, table_state: api_pb2.TableState):
-        new_table_state: ff.TableState = ff.TableState()
+    def update_table_state(self, table_state: AnyTableState, turn_key: Optional[Tuple[int, int]] = None):
+        turn_table = self._turn_tables.take(turn_key) if turn_key is not None else None
+        if turn_table is None:
+            turn_table = self._build_turn_table(table_state)
 
-        for ball in table_state.balls:
-            new_table_state.setBall(ball.number, ball.state, ball.pos.x, ball.pos.y)
-        self._game_table = GameTable.from_table_state(
-            new_table_state, self._shot_speed_factor
-        )
+        new_table_state, self._game_table = turn_table
+        self._game_table.set_shot_speed_factor(self._shot_speed_factor)
         self._org_table_state = table_state
         self._table_state = new_table_state
         self._shot_available = True
 
-    def _handle_shoot(self):
+        if turn_key is not None:
+            self._prefetch_turn_tables()
+
+    def _build_turn_table(self, table_state: AnyTableState) -> TurnTable:
+        new_table_state = self._to_ff_table_state(table_state)
+        return new_table_state, GameTable.from_table_state(
+            new_table_state, self._shot_speed_factor, self._frames_per_second
+        )
+
+    def _active_turn_key(self) -> Tuple[int, int]:
+        return self._active_game_idx, self._active_turn_idx
+
+    def _prefetch_turn_tables(self):
+        # The active turn is rebuilt as well, its table was just taken and stepping back to it should stay cheap
+        first_turn_idx = max(self._active_turn_idx - self.PREFETCH_TURNS, 0)
+        last_turn_idx = min(self._active_turn_idx + self.PREFETCH_TURNS + 1, len(self._turn_history))
+        self._turn_tables.prefetch(
+            ((self._active_game_idx, turn_idx), TableStateCodec.table_state_before(self._turn_history[turn_idx]))
+            for turn_idx in range(first_turn_idx, last_turn_idx)
+        )
+
+    def _handle_shoot(self, on_finished: Optional[Callable[[], None]] = None):
+        if on_finished is None:
+            on_finished = self._handle_shot_finished
+
         if self._turn_history and self._shot_available:
             gt = self._turn_history[self._active_turn_idx]
             gs = gt.gameShot
@@ -258,15 +665,19 @@ class ShowGameServiceHandler:
                     params.a, params.b, params.theta, params.phi, params.v
                 )
 
-                shot = self._table_state.executeShot(params)
+                trajectory = self._precomputed_trajectories.get((self._active_game_idx, self._active_turn_idx))
+                if trajectory is None and self._pre_simulator:
+                    trajectory = self._pre_simulator.get(self._active_game_idx, self._active_turn_idx)
+                if trajectory is None:
+                    trajectory = self._shot_cache.execute(self._table_state, params)
 
-                self._game_table.add_shot(
-                    params, shot, lambda: self._handle_shot_finished()
+                self._game_table.add_trajectory(
+                    params, trajectory, lambda: on_finished()
                 )
                 self._shot_available = False
                 self._shot_params = None
             else:
-                self._handle_shot_finished()
+                on_finished()
 
     def _handle_shot_finished(self):
         self._handle_shift_turn(True)
@@ -3,17 +3,24 @@ from typing import Tuple
 import p5.core.graphics
 from p5 import *
 import fastfiz as ff
+import numpy as np
 from ..compiled_protos import api_pb2
 from vectormath import Vector2
 import os
+import threading
 import time
 from fastfiz_renderer.GameTable import GameTable
+from fastfiz_renderer.HeadlessRenderer import HeadlessRenderer
+from fastfiz_renderer.ScreenshotWriter import ScreenshotWriter
+from .StateHandoff import StateHandoff
+from ..ShotCache import ShotCache
+from ..ShotTreeAtlas import ShotTreeAtlas
+from ..ShotTreeGeometry import ShotTreeGeometry
+from ..TableStateCodec import AnyTableState, TableStateCodec
 from sys import platform
 
 
 class ShowShotsServiceHandler:
-    _instance = None
-
     def __init__(
             self,
             window_pos: Tuple[int, int] = (100, 100),
@@ -22,57 +29,63 @@ class ShowShotsServiceHandler:
             horizontal_mode: bool = False,
             flipped=False,
             screenshot_dir: str = ".",
+            shot_cache: Optional[ShotCache] = None,
+            contact_sheet_columns: int = 6,
+            atlas: Optional[ShotTreeAtlas] = None,
     ):
-        if ShowShotsServiceHandler._instance is None:
-            self._game_table: Optional[GameTable] = None
-
-            self._renderer = "skia"
-            self._mac_mode: bool = platform == "darwin" and self._renderer == "skia"
-            self._window_pos: Tuple[int, int] = window_pos
-            self._frames_per_second: int = frames_per_second
-            self._scaling: int = scaling
-            self._horizontal_mode: bool = horizontal_mode
-            self._stroke_mode: bool = False
-            self._flipped: bool = flipped
-
-            self._ss_dir: str = screenshot_dir
-            self._ss_buffer: Optional[p5.core.graphics.Graphics] = None
-            self._ss_scaling: int = 2000
-
-            self._shot_trees: list[api_pb2.Shot] = []
-            self._active_shot_tree_idx: Optional[int] = None
-
-            self._table_state: Optional[ff.TableState] = None
-            self._org_table_state: Optional[api_pb2.TableState] = None
-            self._shot_vel = 2
-
-            ShowShotsServiceHandler._instance = self
-        else:
-            raise Exception("This class is a singleton!")
+        self._game_table: Optional[GameTable] = None
+
+        self._renderer = "skia"
+        self._mac_mode: bool = platform == "darwin" and self._renderer == "skia"
+        self._window_pos: Tuple[int, int] = window_pos
+        self._frames_per_second: int = frames_per_second
+        self._scaling: int = scaling
+        self._horizontal_mode: bool = horizontal_mode
+        self._stroke_mode: bool = False
+        self._flipped: bool = flipped
+
+        self._ss_scaling: int = 2000
+        self._screenshot_writer = ScreenshotWriter(screenshot_dir, self._ss_scaling, horizontal_mode)
+
+        self._shot_trees: list[api_pb2.Shot] = []
+        self._shot_tree_geometries: list[ShotTreeGeometry] = []
+        self._active_shot_tree_idx: Optional[int] = None
+
+        self._table_state: Optional[ff.TableState] = None
+        self._org_table_state: Optional[api_pb2.TableState] = None
+        self._shot_vel = 2
+        self._shot_cache: ShotCache = shot_cache or ShotCache()
+        self._shots_handoff: StateHandoff[Tuple[Tuple[api_pb2.Shot, ...], api_pb2.TableState]] = StateHandoff()
+
+        self._contact_sheet_mode: bool = False
+        self._contact_sheet_columns: int = contact_sheet_columns
+        self._atlas: ShotTreeAtlas = atlas or ShotTreeAtlas(horizontal_mode=horizontal_mode, flipped=flipped)
+        self._atlas_thread: Optional[threading.Thread] = None
 
     def start_server_window(self):
-        self._game_table = GameTable.from_table_state(ff.TableState(), 1)
+        self._game_table = GameTable.from_table_state(ff.TableState(), 1, self._frames_per_second)
 
         width = int(self._game_table.width * self._scaling)
         length = int(self._game_table.length * self._scaling)
 
-        ss_width = int(self._game_table.width * self._ss_scaling)
-        ss_length = int(self._game_table.length * self._ss_scaling)
-
         if self._horizontal_mode:
             width, length = length, width
-            ss_width, ss_length = ss_length, ss_width
 
         def _setup():
             size(width, length)
-            self._ss_buffer = create_graphics(ss_width, ss_length)
             ellipseMode(CENTER)
             if not self._stroke_mode:
                 noStroke()
 
         def _draw():
+            self._apply_published_shots()
             background(255)
             self._game_table.update(None)
+
+            if self._contact_sheet_mode and self._shot_trees:
+                self._draw_contact_sheet(width, length)
+                return
+
             self._game_table.draw(
                 self._scaling * 2 if self._mac_mode else self._scaling,
                 self._horizontal_mode,
@@ -84,7 +97,7 @@ class ShowShotsServiceHandler:
 
             if self._shot_trees:
                 self._game_table.draw_shot_tree(
-                    self._shot_trees[self._active_shot_tree_idx],
+                    self._shot_tree_geometries[self._active_shot_tree_idx],
                     self._scaling * 2 if self._mac_mode else self._scaling,
                     self._horizontal_mode,
                     self._flipped,
@@ -109,12 +122,26 @@ class ShowShotsServiceHandler:
                     print(f"{self._active_shot_tree_idx + 1} / {len(self._shot_trees)}")
             elif event.key == "f" or event.key == "F":
                 self._stroke_mode = not self._stroke_mode
+            elif event.key == "t" or event.key == "T":
+                self._contact_sheet_mode = not self._contact_sheet_mode
+            elif event.key == "ENTER" and self._contact_sheet_mode:
+                self._contact_sheet_mode = False
+            elif event.key in ["UP", "DOWN"] and self._contact_sheet_mode:
+                if self._shot_trees:
+                    step = -self._contact_sheet_columns if event.key == "UP" else self._contact_sheet_columns
+                    self._active_shot_tree_idx = (self._active_shot_tree_idx + step) % len(self._shot_trees)
+                    print(f"{self._active_shot_tree_idx + 1} / {len(self._shot_trees)}")
+            elif event.key == "a" or event.key == "A":
+                self._handle_save_atlas()
             elif event.key == "UP":
                 self._handle_shoot()
             elif event.key == "s" or event.key == "S":
-                self._handle_screenshot()
+                if not self._handle_screenshot():
+                    print("Screenshot queue is full, screenshot skipped")
             elif event.key == "r" or event.key == "R":
                 self.update_table_state(self._org_table_state)
+            elif event.key == "c" or event.key == "C":
+                print(self._shot_cache.stats())
             elif event.key in [str(val) for val in range(1, 10)]:
                 self._shot_vel = int(event.key.name)
                 self.update_table_state(self._org_table_state)
@@ -130,24 +157,126 @@ class ShowShotsServiceHandler:
             window_title="Cue Canvas Server",
         )
 
+    def publish_shots(self, shot_trees: list[api_pb2.Shot], table_state: AnyTableState):
+        self._shots_handoff.publish((tuple(shot_trees), table_state))
+
+    def _apply_published_shots(self):
+        snapshot = self._shots_handoff.take()
+        if snapshot is not None:
+            shot_trees, table_state = snapshot
+            self.update_shots_trees(shot_trees)
+            self.update_table_state(table_state)
+
     def update_shots_trees(self, shot_trees: list[api_pb2.Shot]):
         self._shot_trees = shot_trees
+        self._shot_tree_geometries = [ShotTreeGeometry.from_shot_tree(shot_tree) for shot_tree in shot_trees]
         if shot_trees:
             self._active_shot_tree_idx = 0
 
-    def update_table_state(self, table_state: api_pb2.TableState):
-        new_table_state: ff.TableState = ff.TableState()
-
-        for ball in table_state.balls:
-            new_table_state.setBall(ball.number, ball.state, ball.pos.x, ball.pos.y)
-        self._game_table = GameTable.from_table_state(new_table_state, 1)
+    def update_table_state(self, table_state: AnyTableState):
+        new_table_state = TableStateCodec.to_ff_table_state(table_state)
+        self._game_table = GameTable.from_table_state(new_table_state, 1, self._frames_per_second)
         self._org_table_state = table_state
         self._table_state = new_table_state
 
-    def _handle_screenshot(self):
-        os.makedirs(self._ss_dir, exist_ok=True)
+    def render_shot_trees_headless(self, output_dir: Optional[str] = None) -> list[np.ndarray]:
+        if self._org_table_state is not None:
+            self.update_table_state(self._org_table_state)
+        elif self._game_table is None:
+            self._game_table = GameTable.from_table_state(ff.TableState(), 1, self._frames_per_second)
+
+        renderer = HeadlessRenderer.for_table(self._game_table, self._scaling, self._horizontal_mode)
+        frames: list[np.ndarray] = []
+
+        for idx, geometry in enumerate(self._shot_tree_geometries):
+            renderer.clear()
+            self._game_table.update(None)
+            self._game_table.draw(
+                self._scaling,
+                self._horizontal_mode,
+                self._flipped,
+                self._stroke_mode,
+                1 if self._stroke_mode else 4,
+                canvas=renderer.canvas
+            )
+            self._game_table.draw_shot_tree(
+                geometry,
+                self._scaling,
+                self._horizontal_mode,
+                self._flipped,
+                3,
+                canvas=renderer.canvas
+            )
+            renderer.collect(frames, output_dir, f"shot_tree_{idx + 1:04d}.png")
+
+        return frames
+
+    def save_shot_tree_atlas(self, path: str) -> np.ndarray:
+        if not self._shot_trees:
+            raise Exception("No shot trees to render!")
+        return self._atlas.save(self._shot_trees, self._org_table_state, path)
+
+    def _handle_save_atlas(self):
+        if self._atlas_thread is not None and self._atlas_thread.is_alive():
+            print("Atlas is still being rendered")
+            return
+        if not self._shot_trees:
+            return
+
+        path = os.path.join(self._screenshot_writer.screenshot_dir, time.strftime("%Y-%m-%d_%T") + "_atlas.png")
+
+        # Rendered by worker processes, the window keeps drawing meanwhile
+        def _save():
+            self.save_shot_tree_atlas(path)
+            print(f"Saved atlas of {len(self._shot_trees)} shot trees to {path}")
+
+        self._atlas_thread = threading.Thread(target=_save, daemon=True)
+        self._atlas_thread.start()
+
+    def _draw_contact_sheet(self, width: int, length: int):
+        # A page of columns x columns tiles around the active tree, all tiles hit one cached background layer
+        columns = self._contact_sheet_columns
+        draw_scale = 2 if self._mac_mode else 1
+        tile_scaling = self._scaling / columns * draw_scale
+        tile_width = width / columns * draw_scale
+        tile_length = length / columns * draw_scale
+
+        per_page = columns * columns
+        first_idx = self._active_shot_tree_idx // per_page * per_page
+
+        for i, geometry in enumerate(self._shot_tree_geometries[first_idx:first_idx + per_page]):
+            push()
+            translate((i % columns) * tile_width, (i // columns) * tile_length)
+            self._game_table.draw(
+                tile_scaling,
+                self._horizontal_mode,
+                self._flipped,
+                self._stroke_mode,
+                1,
+                canvas=p5.renderer
+            )
+            self._game_table.draw_shot_tree(
+                geometry,
+                tile_scaling,
+                self._horizontal_mode,
+                self._flipped,
+                1,
+                canvas=p5.renderer,
+                draw_id_tags=False
+            )
+            pop()
+
+        active = self._active_shot_tree_idx - first_idx
+        noFill()
+        stroke(255, 0, 0)
+        strokeWeight(3 * draw_scale)
+        rect((active % columns) * tile_width, (active // columns) * tile_length, tile_width, tile_length)
+        if not self._stroke_mode:
+            noStroke()
 
-        self._ss_buffer.background(255)
+    def _handle_screenshot(self) -> bool:
+        ss_buffer = self._screenshot_writer.get_buffer(self._game_table)
+        ss_buffer.background(255)
 
         self._game_table.draw(
             self._ss_scaling,
@@ -155,21 +284,22 @@ class ShowShotsServiceHandler:
             self._flipped,
             self._stroke_mode,
             3 if self._stroke_mode else 10,
-            canvas=self._ss_buffer.renderer,
+            canvas=ss_buffer.renderer,
+            use_static_cache=False,
         )
 
         if self._shot_trees:
             self._game_table.draw_shot_tree(
-                self._shot_trees[self._active_shot_tree_idx],
+                self._shot_tree_geometries[self._active_shot_tree_idx],
                 self._ss_scaling,
                 self._horizontal_mode,
                 self._flipped,
                 4,
-                canvas=self._ss_buffer.renderer,
+                canvas=ss_buffer.renderer,
                 draw_id_tags=False
             )
 
-        save_canvas(os.path.join(self._ss_dir, time.strftime("%Y-%m-%d_%T") + ".png"), self._ss_buffer)
+        return self._screenshot_writer.capture()
 
     def _handle_shoot(self):
         target: Vector2 = Vector2(
@@ -204,5 +334,5 @@ class ShowShotsServiceHandler:
         ):
             print("Shot not possible")
         else:
-            shot = self._table_state.executeShot(params)
-            self._game_table.add_shot(params, shot, lambda: None)
+            trajectory = self._shot_cache.execute(self._table_state, params)
+            self._game_table.add_trajectory(params, trajectory, lambda: None)
@@ -0,0 +1,24 @@
+import threading
+from typing import Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class StateHandoff(Generic[T]):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Optional[T] = None
+
+    def publish(self, snapshot: T) -> Optional[T]:
+        # Newer snapshots replace older ones the render thread has not picked up yet, the replaced one is returned
+        with self._lock:
+            replaced, self._pending = self._pending, snapshot
+        return replaced
+
+    def take(self) -> Optional[T]:
+        if self._pending is None:
+            return None
+
+        with self._lock:
+            snapshot, self._pending = self._pending, None
+        return snapshot
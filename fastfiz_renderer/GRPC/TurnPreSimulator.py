@@ -0,0 +1,125 @@
+import multiprocessing
+import threading
+from concurrent import futures
+from typing import Callable, Optional, Tuple
+
+import fastfiz as ff
+
+from ..compiled_protos import api_pb2
+from ..ShotTrajectory import ShotTrajectory
+from ..TableStateCodec import TableStateArrays, TableStateCodec
+
+
+def _simulate_turn(table_state: TableStateArrays, shot_params: Tuple[float, float, float, float, float]) -> ShotTrajectory:
+    ff_table_state = TableStateCodec.to_ff_table_state(table_state)
+    return ShotTrajectory.from_shot(ff_table_state.executeShot(ff.ShotParams(*shot_params)))
+
+
+class TurnPreSimulator:
+    def __init__(self, max_workers: Optional[int] = None,
+                 on_turn_done: Optional[Callable[[int, int, ShotTrajectory], None]] = None):
+        self._max_workers = max_workers
+        self._on_turn_done_callback = on_turn_done
+        self._pool: Optional[futures.ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._futures: dict[Tuple[int, int], futures.Future] = {}
+        self._submitted_games: set[int] = set()
+        self._generation = 0
+        self._done = 0
+        self._total = 0
+
+    @property
+    def progress(self) -> Tuple[int, int]:
+        return self._done, self._total
+
+    def submit_games(self, games: list[api_pb2.Game]):
+        self.reset()
+        self.append_games(games, 0)
+
+    def reset(self):
+        with self._lock:
+            for future in self._futures.values():
+                future.cancel()
+
+            self._generation += 1
+            self._futures = {}
+            self._submitted_games = set()
+            self._done = 0
+            self._total = 0
+
+    def has_game(self, game_idx: int) -> bool:
+        return game_idx in self._submitted_games
+
+    def retain_games(self, first_game_idx: int, last_game_idx: int):
+        # Drops every game outside [first_game_idx, last_game_idx), turns not started yet are cancelled
+        with self._lock:
+            for key in [key for key in self._futures if not first_game_idx <= key[0] < last_game_idx]:
+                if self._futures.pop(key).cancel():
+                    self._total -= 1
+            self._submitted_games = {game_idx for game_idx in self._submitted_games
+                                     if first_game_idx <= game_idx < last_game_idx}
+
+    def append_games(self, games: list[api_pb2.Game], first_game_idx: int):
+        submitted: list[Tuple[Tuple[int, int], futures.Future]] = []
+
+        with self._lock:
+            for game_idx, game in enumerate(games, start=first_game_idx):
+                self._submitted_games.add(game_idx)
+                game_states = TableStateCodec.iter_game_states(game)
+                for turn_idx, (turn, (table_state, _)) in enumerate(zip(game.turnHistory, game_states)):
+                    if turn.gameShot.decision == "DEC_CONCEDE":
+                        continue
+
+                    sp = turn.gameShot.shotParams
+                    future = self._submit_locked(game_idx, turn_idx, table_state, (sp.a, sp.b, sp.theta, sp.phi, sp.v))
+                    submitted.append(((game_idx, turn_idx), future))
+
+            generation = self._generation
+
+        for key, future in submitted:
+            future.add_done_callback(lambda f, key=key: self._on_turn_done(generation, key, f))
+
+    def submit_turn(self, game_idx: int, turn_idx: int, table_state: TableStateArrays,
+                    shot_params: Tuple[float, float, float, float, float]) -> futures.Future:
+        with self._lock:
+            self._submitted_games.add(game_idx)
+            future = self._submit_locked(game_idx, turn_idx, table_state, shot_params)
+            generation = self._generation
+
+        future.add_done_callback(lambda f: self._on_turn_done(generation, (game_idx, turn_idx), f))
+        return future
+
+    def _submit_locked(self, game_idx: int, turn_idx: int, table_state: TableStateArrays,
+                       shot_params: Tuple[float, float, float, float, float]) -> futures.Future:
+        if self._pool is None:
+            # Spawned rather than forked, forking next to running gRPC threads can deadlock the child
+            self._pool = futures.ProcessPoolExecutor(max_workers=self._max_workers,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+
+        future = self._pool.submit(_simulate_turn, table_state, shot_params)
+        self._futures[(game_idx, turn_idx)] = future
+        self._total += 1
+        return future
+
+    def get(self, game_idx: int, turn_idx: int) -> Optional[ShotTrajectory]:
+        future = self._futures.get((game_idx, turn_idx))
+
+        if future is None or not future.done() or future.cancelled() or future.exception() is not None:
+            return None
+        return future.result()
+
+    def _on_turn_done(self, generation: int, key: Tuple[int, int], future: futures.Future):
+        if future.cancelled():
+            return
+
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._done += 1
+            done, total = self._done, self._total
+
+        if self._on_turn_done_callback and future.exception() is None:
+            self._on_turn_done_callback(*key, future.result())
+
+        if done == total or done % max(total // 10, 1) == 0:
+            print(f"Pre-simulated {done} / {total} turns")
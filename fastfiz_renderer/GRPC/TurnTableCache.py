@@ -0,0 +1,62 @@
+import threading
+from collections import OrderedDict
+from concurrent import futures
+from typing import Callable, Hashable, Iterable, Optional, Tuple
+
+import fastfiz as ff
+
+from ..GameTable import GameTable
+from ..TableStateCodec import AnyTableState
+
+TurnTable = Tuple[ff.TableState, GameTable]
+
+
+class TurnTableCache:
+    def __init__(self, build: Callable[[AnyTableState], TurnTable], max_entries: int = 32):
+        self.max_entries = max_entries
+        self._build = build
+
+        self._entries: OrderedDict[Hashable, TurnTable] = OrderedDict()
+        self._pending: dict[Hashable, futures.Future] = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._executor = futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="TurnTablePrefetch")
+
+    def take(self, key: Hashable) -> Optional[TurnTable]:
+        # Entries are handed out rather than shared, playing a shot mutates both the table state and the table
+        with self._lock:
+            return self._entries.pop(key, None)
+
+    def prefetch(self, turns: Iterable[Tuple[Hashable, AnyTableState]]):
+        with self._lock:
+            generation = self._generation
+            for key, table_state in turns:
+                if key in self._entries or key in self._pending:
+                    continue
+                self._pending[key] = self._executor.submit(self._prebuild, generation, key, table_state)
+
+    def clear(self):
+        with self._lock:
+            for future in self._pending.values():
+                future.cancel()
+
+            self._generation += 1
+            self._entries.clear()
+            self._pending.clear()
+
+    def _prebuild(self, generation: int, key: Hashable, table_state: AnyTableState):
+        try:
+            turn_table = self._build(table_state)
+        except Exception as e:
+            print(f"Failed to prebuild table for turn {key}: {e}")
+            turn_table = None
+
+        with self._lock:
+            if generation != self._generation:
+                return
+
+            del self._pending[key]
+            if turn_table is not None:
+                self._entries[key] = turn_table
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
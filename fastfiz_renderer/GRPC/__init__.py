@@ -1,3 +1,8 @@
 from .ShowShotsServiceHandler import ShowShotsServiceHandler
 from .ShowGameServiceHandler import ShowGameServiceHandler
 from .Server import Server
+from .AsyncServer import AsyncServer
+from .RenderProcess import RenderProcess
+from .StateHandoff import StateHandoff
+from .TurnPreSimulator import TurnPreSimulator
+from .TurnTableCache import TurnTableCache
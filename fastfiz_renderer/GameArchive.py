@@ -0,0 +1,252 @@
+import mmap
+import struct
+from array import array
+from collections import OrderedDict
+from typing import BinaryIO, Iterator, Tuple
+
+import numpy as np
+
+import fastfiz_renderer.compiled_protos.api_pb2 as api_pb2
+
+from .TableStateCodec import TableStateCodec
+
+
+def _encode_varint(value: int) -> bytes:
+    encoded = bytearray()
+    while True:
+        bits = value & 0x7F
+        value >>= 7
+        if value:
+            encoded.append(bits | 0x80)
+        else:
+            encoded.append(bits)
+            return bytes(encoded)
+
+
+def _decode_varint(buffer, pos: int) -> Tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        if pos >= len(buffer):
+            raise Exception("Truncated game archive!")
+        byte = buffer[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+class GameArchiveWriter:
+    # Each game is a varint length prefix followed by a serialized Game,
+    # the same framing as protobuf's writeDelimitedTo/parseDelimitedFrom
+    def __init__(self, path: str):
+        self.path = path
+        self.game_count = 0
+        self._file: BinaryIO = open(path, "wb")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def write(self, game: api_pb2.Game):
+        data = game.SerializeToString()
+        self._file.write(_encode_varint(len(data)))
+        self._file.write(data)
+        self.game_count += 1
+
+    def close(self):
+        self._file.close()
+
+    @staticmethod
+    def convert_show_games_request_file(show_games_request_path: str, archive_path: str) -> int:
+        with GameArchiveWriter(archive_path) as writer:
+            for game in GameArchiveReader(show_games_request_path, show_games_request=True):
+                writer.write(game)
+
+        return writer.game_count
+
+
+class GameArchiveReader:
+    # A serialized ShowGamesRequest is the same framing with a field 1 tag before every game,
+    # so it can be read game by game as well instead of being parsed whole
+    _GAMES_FIELD_TAG = 0x0a
+
+    def __init__(self, path: str, show_games_request: bool = False):
+        self.path = path
+        self.show_games_request = show_games_request
+
+    def __iter__(self) -> Iterator[api_pb2.Game]:
+        with open(self.path, "rb") as f:
+            if f.seek(0, 2) == 0:
+                return
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                pos = 0
+                while pos < len(mm):
+                    if self.show_games_request:
+                        if mm[pos] != GameArchiveReader._GAMES_FIELD_TAG:
+                            raise Exception("Not a ShowGamesRequest of games only!")
+                        pos += 1
+                    length, pos = _decode_varint(mm, pos)
+                    if pos + length > len(mm):
+                        raise Exception("Truncated game archive!")
+                    yield api_pb2.Game.FromString(mm[pos:pos + length])
+                    pos += length
+
+
+class IndexedGameArchiveWriter:
+    # Layout: MAGIC, turn records, footer, footer offset (u64), MAGIC.
+    # A turn record is the GameTurn encoded as field 1 of a Game, so the bytes of a whole game
+    # are themselves a valid serialized Game. The footer holds the first turn index of every game
+    # (game_count + 1 entries) followed by the byte offset of every turn (turn_count + 1 entries).
+    MAGIC = b"FFZIDX01"
+    _TURN_FIELD_TAG = b"\x0a"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file: BinaryIO = open(path, "wb")
+        self._file.write(IndexedGameArchiveWriter.MAGIC)
+        self._offset = len(IndexedGameArchiveWriter.MAGIC)
+        self._game_first_turn = array("Q", [0])
+        self._turn_offsets = array("Q")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    @property
+    def game_count(self) -> int:
+        return len(self._game_first_turn) - 1
+
+    def write(self, game: api_pb2.Game):
+        # Turns are stored self-contained so any single turn can be decoded on its own
+        if TableStateCodec.is_delta_encoded(game):
+            expanded_game = api_pb2.Game()
+            expanded_game.CopyFrom(game)
+            TableStateCodec.expand_delta_game(expanded_game)
+            game = expanded_game
+
+        for turn in game.turnHistory:
+            data = turn.SerializeToString()
+            record = IndexedGameArchiveWriter._TURN_FIELD_TAG + _encode_varint(len(data)) + data
+            self._turn_offsets.append(self._offset)
+            self._file.write(record)
+            self._offset += len(record)
+
+        self._game_first_turn.append(len(self._turn_offsets))
+
+    def close(self):
+        if self._file.closed:
+            return
+
+        self._turn_offsets.append(self._offset)
+        footer_offset = self._offset
+
+        self._file.write(struct.pack("<QQ", self.game_count, len(self._turn_offsets) - 1))
+        self._file.write(self._game_first_turn.tobytes())
+        self._file.write(self._turn_offsets.tobytes())
+        self._file.write(struct.pack("<Q", footer_offset))
+        self._file.write(IndexedGameArchiveWriter.MAGIC)
+        self._file.close()
+
+    @staticmethod
+    def convert_game_archive_file(game_archive_path: str, indexed_archive_path: str) -> int:
+        with IndexedGameArchiveWriter(indexed_archive_path) as writer:
+            for game in GameArchiveReader(game_archive_path):
+                writer.write(game)
+
+        return writer.game_count
+
+
+class IndexedGameArchive:
+    def __init__(self, path: str, cache_size: int = 32):
+        self.path = path
+        self.cache_size = cache_size
+        self._cache: OrderedDict[int, api_pb2.Game] = OrderedDict()
+
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic = IndexedGameArchiveWriter.MAGIC
+        trailer_size = 8 + len(magic)
+        if self._mm[:len(magic)] != magic or self._mm[-len(magic):] != magic:
+            raise Exception(f"{path} is not an indexed game archive!")
+
+        footer_offset = struct.unpack_from("<Q", self._mm, len(self._mm) - trailer_size)[0]
+        game_count, turn_count = struct.unpack_from("<QQ", self._mm, footer_offset)
+
+        # Views straight into the mapped file, so the index costs no resident memory until it is read
+        index_offset = footer_offset + 16
+        self._game_first_turn = np.frombuffer(self._mm, dtype="<u8", count=game_count + 1, offset=index_offset)
+        index_offset += 8 * (game_count + 1)
+        self._turn_offsets = np.frombuffer(self._mm, dtype="<u8", count=turn_count + 1, offset=index_offset)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def __len__(self) -> int:
+        self._check_open()
+        return len(self._game_first_turn) - 1
+
+    def __getitem__(self, game_idx: int) -> api_pb2.Game:
+        game_idx = self._check_game_idx(game_idx)
+
+        game = self._cache.get(game_idx)
+        if game is not None:
+            self._cache.move_to_end(game_idx)
+            return game
+
+        start = int(self._turn_offsets[self._game_first_turn[game_idx]])
+        end = int(self._turn_offsets[self._game_first_turn[game_idx + 1]])
+        game = api_pb2.Game.FromString(self._mm[start:end])
+
+        self._cache[game_idx] = game
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+        return game
+
+    def turn_count(self, game_idx: int) -> int:
+        game_idx = self._check_game_idx(game_idx)
+        return int(self._game_first_turn[game_idx + 1] - self._game_first_turn[game_idx])
+
+    def get_turn(self, game_idx: int, turn_idx: int) -> api_pb2.GameTurn:
+        game_idx = self._check_game_idx(game_idx)
+        if not 0 <= turn_idx < self.turn_count(game_idx):
+            raise IndexError(f"Turn {turn_idx} out of range for game {game_idx}")
+
+        record_idx = int(self._game_first_turn[game_idx]) + turn_idx
+        pos = int(self._turn_offsets[record_idx]) + 1
+        length, pos = _decode_varint(self._mm, pos)
+        return api_pb2.GameTurn.FromString(self._mm[pos:pos + length])
+
+    def close(self):
+        if self._mm.closed:
+            return
+
+        # The index arrays are views into the mapping, empty ones let it close
+        self._cache.clear()
+        self._game_first_turn = self._game_first_turn[:0].copy()
+        self._turn_offsets = self._turn_offsets[:0].copy()
+        self._mm.close()
+        self._file.close()
+
+    def _check_open(self):
+        if self._mm.closed:
+            raise Exception(f"Archive {self.path} is closed!")
+
+    def _check_game_idx(self, game_idx: int) -> int:
+        self._check_open()
+        if game_idx < 0:
+            game_idx += len(self)
+        if not 0 <= game_idx < len(self):
+            raise IndexError(f"Game {game_idx} out of range")
+        return game_idx
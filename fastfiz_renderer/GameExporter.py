@@ -0,0 +1,191 @@
+import os
+from collections import deque
+from concurrent import futures
+from typing import Optional, Union, BinaryIO
+
+import fastfiz as ff
+import skia
+
+import fastfiz_renderer.compiled_protos.api_pb2 as api_pb2
+
+from .GameHandler import GameHandler
+from .GameTable import GameTable
+from .HeadlessRenderer import HeadlessRenderer
+from .PlaybackClock import PlaybackClock, FakeTimeSource
+from .TableStateCodec import TableStateCodec
+
+
+class GameExporter:
+    PNG = "png"
+    RGB = "rgb"
+
+    def __init__(
+            self,
+            scaling: int = 200,
+            frames_per_second: int = 60,
+            horizontal_mode: bool = False,
+            flipped: bool = False,
+            stroke_mode: bool = False,
+            shot_speed_factor: float = 1,
+            output_format: str = PNG,
+            max_workers: int = 4,
+            max_pending_frames: int = 64,
+            max_turns: Optional[int] = 1000,
+    ):
+        if output_format not in (GameExporter.PNG, GameExporter.RGB):
+            raise Exception(f"Unknown output format: {output_format}")
+
+        self._scaling = scaling
+        self._frames_per_second = frames_per_second
+        self._horizontal_mode = horizontal_mode
+        self._flipped = flipped
+        self._stroke_mode = stroke_mode
+        self._shot_speed_factor = shot_speed_factor
+        self._output_format = output_format
+        self._max_workers = max_workers
+        self._max_pending_frames = max_pending_frames
+        self._max_turns = max_turns
+
+        self.cut_off_games: int = 0
+
+    def export_games(self, games: list[GameHandler.Game], output_dir: str) -> list[str]:
+        self.cut_off_games = 0
+        with futures.ThreadPoolExecutor(max_workers=self._max_workers) as pool:
+            return [self._export_decider_game(pool, game, output_dir, game_number)
+                    for game_number, game in enumerate(games, start=1)]
+
+    def export_show_games_request(self, request: Union[api_pb2.ShowGamesRequest, list[api_pb2.Game]],
+                                  output_dir: str) -> list[str]:
+        games = request.games if isinstance(request, api_pb2.ShowGamesRequest) else request
+
+        with futures.ThreadPoolExecutor(max_workers=self._max_workers) as pool:
+            return [self._export_recorded_game(pool, game, output_dir, game_number)
+                    for game_number, game in enumerate(games, start=1)]
+
+    def _export_decider_game(self, pool: futures.Executor, game: GameHandler.Game, output_dir: str,
+                             game_number: int) -> str:
+        # Played on a copy, the caller's table state is left as it was
+        table_state = TableStateCodec.to_ff_table_state(TableStateCodec.from_ff_table_state(game[0]))
+        shot_decider = game[1]
+        game_table = GameTable.from_table_state(table_state, self._shot_speed_factor)
+        renderer = HeadlessRenderer.for_table(game_table, self._scaling, self._horizontal_mode)
+
+        with _FrameSequence(self, pool, renderer, output_dir, game_number) as sequence:
+            sequence.render_frame(game_table)
+            turn_count = 0
+
+            while not table_state.getBall(ff.Ball.CUE).isPocketed():
+                # A decider that never clears the table would otherwise write frames without end
+                if self._max_turns is not None and turn_count >= self._max_turns:
+                    self.cut_off_games += 1
+                    print(f"Game {game_number} cut off at {self._max_turns} turns")
+                    break
+
+                params = shot_decider(table_state)
+
+                if params is None or table_state.isPhysicallyPossible(params) != ff.TableState.OK_PRECONDITION:
+                    break
+
+                shot = table_state.executeShot(params)
+                game_table.add_shot(params, shot, lambda: None)
+                sequence.play_shots(game_table)
+                turn_count += 1
+
+            return sequence.path
+
+    def _export_recorded_game(self, pool: futures.Executor, game: api_pb2.Game, output_dir: str,
+                              game_number: int) -> str:
+        table: ff.Table = ff.TableState().getTable()
+        renderer = HeadlessRenderer.for_board(table.TABLE_WIDTH, table.TABLE_LENGTH, self._scaling,
+                                              self._horizontal_mode)
+
+        with _FrameSequence(self, pool, renderer, output_dir, game_number) as sequence:
+            for turn, (before, _) in zip(game.turnHistory, TableStateCodec.iter_game_states(game)):
+                table_state = TableStateCodec.to_ff_table_state(before)
+
+                game_table = GameTable.from_table_state(table_state, self._shot_speed_factor)
+                sequence.render_frame(game_table, turn.gameShot.shotParams)
+
+                if turn.gameShot.decision == "DEC_CONCEDE":
+                    continue
+
+                sp = turn.gameShot.shotParams
+                params = ff.ShotParams(sp.a, sp.b, sp.theta, sp.phi, sp.v)
+                game_table.add_shot(params, table_state.executeShot(params), lambda: None)
+                sequence.play_shots(game_table)
+
+            return sequence.path
+
+
+class _FrameSequence:
+    def __init__(self, exporter: GameExporter, pool: futures.Executor, renderer: HeadlessRenderer, output_dir: str,
+                 game_number: int):
+        self._exporter = exporter
+        self._pool = pool
+        self._renderer = renderer
+        self._time_source = FakeTimeSource(exporter._frames_per_second)
+        self._pending: deque[futures.Future] = deque()
+        self._stream: Optional[BinaryIO] = None
+        self.frame_count = 0
+
+        os.makedirs(output_dir, exist_ok=True)
+        if exporter._output_format == GameExporter.RGB:
+            self.path = os.path.join(output_dir, f"game_{game_number:05d}.rgb")
+            self._stream = open(self.path, "wb")
+        else:
+            self.path = os.path.join(output_dir, f"game_{game_number:05d}")
+            os.makedirs(self.path, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        while self._pending:
+            self._write_oldest()
+
+        if self._stream:
+            self._stream.close()
+
+    def play_shots(self, game_table: GameTable):
+        while not game_table.is_idle():
+            self.render_frame(game_table)
+
+    def render_frame(self, game_table: GameTable, shot_params: Optional[api_pb2.ShotParams] = None):
+        exporter = self._exporter
+        if game_table.clock.time_source is not self._time_source:
+            game_table.clock = PlaybackClock(exporter._shot_speed_factor, exporter._frames_per_second,
+                                             self._time_source)
+
+        self._renderer.clear()
+        game_table.update(None)
+        game_table.draw(
+            exporter._scaling,
+            exporter._horizontal_mode,
+            exporter._flipped,
+            exporter._stroke_mode,
+            1 if exporter._stroke_mode else 4,
+            shot_params=shot_params if game_table.is_idle() else None,
+            canvas=self._renderer.canvas
+        )
+
+        image = self._renderer.snapshot()
+        if self._stream:
+            self._pending.append(self._pool.submit(self._encode_rgb, image))
+        else:
+            path = os.path.join(self.path, f"frame_{self.frame_count:06d}.png")
+            self._pending.append(self._pool.submit(image.save, path, skia.kPNG))
+
+        if len(self._pending) > self._exporter._max_pending_frames:
+            self._write_oldest()
+
+        self._time_source.tick()
+        self.frame_count += 1
+
+    def _write_oldest(self):
+        result = self._pending.popleft().result()
+        if self._stream:
+            self._stream.write(result)
+
+    @staticmethod
+    def _encode_rgb(image: skia.Image) -> bytes:
+        return image.toarray(colorType=skia.kRGBA_8888_ColorType)[:, :, :3].tobytes()
@@ -2,15 +2,19 @@ from typing import Tuple, Set
 
 from p5 import *
 import fastfiz as ff
+import numpy as np
 from vectormath import Vector2
 import os
 import time
 from .GameTable import GameTable
+from .HeadlessRenderer import HeadlessRenderer
+from .ScreenshotWriter import ScreenshotWriter
+from .ShotCache import ShotCache
+from .ShotDecisionRunner import ShotDecisionRunner
 from sys import platform
 
 
 class GameHandler:
-    _instance = None
     ShotDecider = Callable[[ff.TableState], Optional[ff.ShotParams]]
     Game = Tuple[ff.TableState, ShotDecider]
 
@@ -22,33 +26,44 @@ class GameHandler:
         horizontal_mode: bool = False,
         flipped: bool = False,
         screenshot_dir: str = ".",
+        shot_cache: Optional[ShotCache] = None,
+        shot_decision_runner: Optional[ShotDecisionRunner] = None,
     ):
-        if GameHandler._instance is None:
-            self._game_number: int = 0
-            self._games: list[GameHandler.Game] = []
-            self._game_table: Optional[GameTable] = None
-            self._table_state: Optional[ff.TableState] = None
-            self._start_ball_positions: dict[int, Tuple[float, float]] = dict()
-            self._shot_decider: Optional[GameHandler.ShotDecider] = None
-
-            self._renderer = "skia"
-            self._mac_mode: bool = platform == "darwin" and self._renderer == "skia"
-            self._window_pos: Tuple[int, int] = window_pos
-            self._frames_per_second: int = frames_per_second
-            self._scaling: int = scaling
-            self._horizontal_mode: bool = horizontal_mode
-            self._flipped: bool = flipped
-            self._stroke_mode: bool = False
-            self._grab_mode: bool = False
-            self._shot_speed_factor: float = 1
-
-            self._ss_dir: str = screenshot_dir
-            self._ss_buffer: Optional[p5.core.graphics.Graphics] = None
-            self._ss_scaling: int = 2000
-
-            GameHandler._instance = self
-        else:
-            raise Exception("This class is a singleton!")
+        self._game_number: int = 0
+        self._games: list[GameHandler.Game] = []
+        self._game_table: Optional[GameTable] = None
+        self._table_state: Optional[ff.TableState] = None
+        self._start_ball_positions: dict[int, Tuple[float, float]] = dict()
+        self._shot_decider: Optional[GameHandler.ShotDecider] = None
+
+        self._renderer = "skia"
+        self._mac_mode: bool = platform == "darwin" and self._renderer == "skia"
+        self._window_pos: Tuple[int, int] = window_pos
+        self._frames_per_second: int = frames_per_second
+        self._scaling: int = scaling
+        self._horizontal_mode: bool = horizontal_mode
+        self._flipped: bool = flipped
+        self._stroke_mode: bool = False
+        self._grab_mode: bool = False
+        self._shot_speed_factor: float = 1
+        self._headless: bool = False
+        self._games_done: bool = False
+        self._shot_cache: ShotCache = shot_cache or ShotCache()
+        # Without a runner deciders run inline on the draw thread
+        self._decision_runner: Optional[ShotDecisionRunner] = shot_decision_runner
+
+        self._ss_scaling: int = 2000
+        self._screenshot_writer = ScreenshotWriter(screenshot_dir, self._ss_scaling, horizontal_mode)
+
+        self._grid_tiles: list[GameHandler.GridTile] = []
+
+    class GridTile:
+        def __init__(self, table_state: ff.TableState, shot_decider, game_number: int, game_table: GameTable):
+            self.table_state: ff.TableState = table_state
+            self.shot_decider = shot_decider
+            self.game_number: int = game_number
+            self.game_table: GameTable = game_table
+            self.done: bool = False
 
     def play_eight_ball_games(
         self,
@@ -75,27 +90,22 @@ class GameHandler:
         self._shot_speed_factor = shot_speed_factor
         self._handle_next_game()
 
-        shot_requester = self._handle_shoot if auto_play else None
         width = int(self._game_table.width * self._scaling)
         length = int(self._game_table.length * self._scaling)
 
-        ss_width = int(self._game_table.width * self._ss_scaling)
-        ss_length = int(self._game_table.length * self._ss_scaling)
-
         if self._horizontal_mode:
             width, length = length, width
-            ss_width, ss_length = ss_length, ss_width
 
         def _setup():
             size(width, length)
-            self._ss_buffer = create_graphics(ss_width, ss_length)
             ellipseMode(CENTER)
             if not self._stroke_mode:
                 noStroke()
 
         def _draw():
             background(255)
-            self._game_table.update(shot_requester)
+            # A decision started by hand is polled like an automatic one until it finishes
+            self._game_table.update(self._handle_shoot if auto_play or self._is_decision_pending() else None)
             self._game_table.draw(
                 self._scaling * 2 if self._mac_mode else self._scaling,
                 self._horizontal_mode,
@@ -114,11 +124,16 @@ class GameHandler:
                 print(f"{self._game_number}: Game skipped")
                 self._handle_next_game()
             elif event.key == "s" or event.key == "S":
-                self._handle_screenshot()
+                if not self._handle_screenshot():
+                    print("Screenshot queue is full, screenshot skipped")
             elif event.key == "f" or event.key == "F":
                 self._stroke_mode = not self._stroke_mode
             elif event.key == "g" or event.key == "G":
                 self._grab_mode = not self._grab_mode
+            elif event.key == "c" or event.key == "C":
+                print(self._shot_cache.stats())
+            elif event.key == "l" or event.key == "L":
+                print(self._decision_stats())
 
         def _mouse_pressed(_):
             if self._grab_mode:
@@ -171,10 +186,129 @@ class GameHandler:
             window_title="Cue Canvas",
         )
 
-    def _handle_screenshot(self):
-        os.makedirs(self._ss_dir, exist_ok=True)
+    def play_games_grid(
+        self,
+        games: list[Game],
+        columns: int = 4,
+        tiles: int = 16,
+        tile_scaling: int = 60,
+        shot_speed_factor: float = 1,
+    ):
+        if not games:
+            raise Exception("No games provided!")
+        if columns < 1 or tiles < 1:
+            raise Exception("Grid needs at least one column and one tile!")
+
+        self._games = games
+        self._verify_table_dimensions()
+        self._shot_speed_factor = shot_speed_factor
+        self._grid_tiles = []
+        for _ in range(min(tiles, len(games))):
+            self._grid_tiles.append(self._next_grid_tile())
+
+        columns = min(columns, len(self._grid_tiles))
+        rows = ceil(len(self._grid_tiles) / columns)
+        tile_table = self._grid_tiles[0].game_table
+        tile_width = int(tile_table.width * tile_scaling)
+        tile_length = int(tile_table.length * tile_scaling)
+
+        if self._horizontal_mode:
+            tile_width, tile_length = tile_length, tile_width
+
+        def _setup():
+            size(tile_width * columns, tile_length * rows)
+            ellipseMode(CENTER)
+            if not self._stroke_mode:
+                noStroke()
+
+        def _draw():
+            background(255)
+            # Every tile shares one scaling and orientation, so they all hit the same cached background layer
+            draw_scale = 2 if self._mac_mode else 1
+            for i, tile in enumerate(self._grid_tiles):
+                if not tile.done:
+                    tile.game_table.update(lambda: self._handle_grid_shoot(i))
+
+                push()
+                translate((i % columns) * tile_width * draw_scale, (i // columns) * tile_length * draw_scale)
+                self._grid_tiles[i].game_table.draw(
+                    tile_scaling * draw_scale,
+                    self._horizontal_mode,
+                    self._flipped,
+                    self._stroke_mode,
+                    1,
+                    canvas=p5.renderer
+                )
+                pop()
+
+        def _key_released(event):
+            if event.key == "n" or event.key == "N":
+                for i, tile in enumerate(self._grid_tiles):
+                    if not tile.done:
+                        print(f"{tile.game_number}: Game skipped")
+                        self._handle_next_grid_game(i)
+            elif event.key == "f" or event.key == "F":
+                self._stroke_mode = not self._stroke_mode
+            elif event.key == "c" or event.key == "C":
+                print(self._shot_cache.stats())
+            elif event.key == "l" or event.key == "L":
+                print(self._decision_stats())
+
+        run(
+            renderer=self._renderer,
+            frame_rate=self._frames_per_second,
+            sketch_draw=_draw,
+            sketch_setup=_setup,
+            sketch_key_released=_key_released,
+            window_xpos=self._window_pos[0],
+            window_ypos=self._window_pos[1],
+            window_title="Cue Canvas",
+        )
+
+    def render_games_headless(
+        self,
+        games: list[Game],
+        shot_speed_factor: float = 1,
+        output_dir: Optional[str] = None,
+        max_frames: Optional[int] = None,
+    ) -> list[np.ndarray]:
+        if not games:
+            raise Exception("No games provided!")
 
-        self._ss_buffer.background(255)
+        self._games = games
+        self._verify_table_dimensions()
+        self._shot_speed_factor = shot_speed_factor
+        self._headless = True
+        self._games_done = False
+        self._handle_next_game()
+
+        renderer = HeadlessRenderer.for_table(self._game_table, self._scaling, self._horizontal_mode)
+        frames: list[np.ndarray] = []
+        frame_number = 0
+
+        try:
+            while not self._games_done and (max_frames is None or frame_number < max_frames):
+                renderer.advance_frame(self._game_table, self._shot_speed_factor, self._frames_per_second)
+                renderer.clear()
+                self._game_table.update(self._handle_shoot)
+                self._game_table.draw(
+                    self._scaling,
+                    self._horizontal_mode,
+                    self._flipped,
+                    self._stroke_mode,
+                    1 if self._stroke_mode else 4,
+                    canvas=renderer.canvas
+                )
+                renderer.collect(frames, output_dir, f"frame_{frame_number:06d}.png")
+                frame_number += 1
+        finally:
+            self._headless = False
+
+        return frames
+
+    def _handle_screenshot(self) -> bool:
+        ss_buffer = self._screenshot_writer.get_buffer(self._game_table)
+        ss_buffer.background(255)
 
         self._game_table.draw(
             self._ss_scaling,
@@ -182,36 +316,46 @@ class GameHandler:
             self._flipped,
             self._stroke_mode,
             3 if self._stroke_mode else 10,
-            canvas=self._ss_buffer.renderer,
+            canvas=ss_buffer.renderer,
+            use_static_cache=False,
         )
 
-        save_canvas(os.path.join(self._ss_dir, time.strftime("%Y-%m-%d_%T") + ".png"), self._ss_buffer)
+        return self._screenshot_writer.capture()
 
-    def _handle_next_game(self):
+    def _handle_next_game(self) -> bool:
+        self._cancel_decision()
         if self._games:
             self._table_state, self._shot_decider = self._games.pop(0)
             self._game_table = GameTable.from_table_state(
-                self._table_state, self._shot_speed_factor
+                self._table_state, self._shot_speed_factor, self._frames_per_second
             )
             self._game_number += 1
             self._load_start_balls()
+            return True
         else:
             print("No more games left")
-            exit()
+            if not self._headless:
+                exit()
+            self._games_done = True
+            return False
 
     def _handle_restart(self):
+        self._cancel_decision()
         for ball_number, pos in self._start_ball_positions.items():
             self._table_state.setBall(ball_number, ff.Ball.STATIONARY, pos[0], pos[1])
         self._game_table = GameTable.from_table_state(
-            self._table_state, self._shot_speed_factor
+            self._table_state, self._shot_speed_factor, self._frames_per_second
         )
 
     def _handle_shoot(self):
         if self._table_state.getBall(ff.Ball.CUE).isPocketed():
             print(f"{self._game_number}: Cue ball pocketed")
-            self._handle_next_game()
+            if not self._handle_next_game():
+                return
 
-        params = self._shot_decider(self._table_state)
+        done, params = self._decide(self._shot_decider, self._table_state)
+        if not done:
+            return
 
         if params is None:
             print(f"{self._game_number}: No more shots left")
@@ -223,8 +367,68 @@ class GameHandler:
             print(f"{self._game_number}: Shot not possible")
             self._handle_next_game()
         else:
-            shot = self._table_state.executeShot(params)
-            self._game_table.add_shot(params, shot, lambda: None)
+            trajectory = self._shot_cache.execute(self._table_state, params)
+            self._game_table.add_trajectory(params, trajectory, lambda: None)
+
+    def _next_grid_tile(self) -> "GameHandler.GridTile":
+        table_state, shot_decider = self._games.pop(0)
+        self._game_number += 1
+        game_table = GameTable.from_table_state(table_state, self._shot_speed_factor, self._frames_per_second)
+        return GameHandler.GridTile(table_state, shot_decider, self._game_number, game_table)
+
+    def _handle_next_grid_game(self, tile_idx: int):
+        self._cancel_decision(tile_idx)
+        if self._games:
+            self._grid_tiles[tile_idx] = self._next_grid_tile()
+            return
+
+        self._grid_tiles[tile_idx].done = True
+        if all(tile.done for tile in self._grid_tiles):
+            print("No more games left")
+            exit()
+
+    def _handle_grid_shoot(self, tile_idx: int):
+        tile = self._grid_tiles[tile_idx]
+
+        if tile.table_state.getBall(ff.Ball.CUE).isPocketed():
+            print(f"{tile.game_number}: Cue ball pocketed")
+            self._handle_next_grid_game(tile_idx)
+            return
+
+        done, params = self._decide(tile.shot_decider, tile.table_state, tile_idx)
+        if not done:
+            return
+
+        if params is None:
+            print(f"{tile.game_number}: No more shots left")
+            self._handle_next_grid_game(tile_idx)
+        elif tile.table_state.isPhysicallyPossible(params) != ff.TableState.OK_PRECONDITION:
+            print(f"{tile.game_number}: Shot not possible")
+            self._handle_next_grid_game(tile_idx)
+        else:
+            trajectory = self._shot_cache.execute(tile.table_state, params)
+            tile.game_table.add_trajectory(params, trajectory, lambda: None)
+
+    def _decide(self, shot_decider: ShotDecider, table_state: ff.TableState,
+                key=None) -> Tuple[bool, Optional[ff.ShotParams]]:
+        if self._decision_runner is None:
+            return True, shot_decider(table_state)
+
+        if not self._decision_runner.is_pending(key):
+            self._decision_runner.submit(shot_decider, table_state, key)
+        return self._decision_runner.poll(key)
+
+    def _is_decision_pending(self) -> bool:
+        return self._decision_runner is not None and self._decision_runner.is_pending()
+
+    def _cancel_decision(self, key=None):
+        if self._decision_runner is not None:
+            self._decision_runner.cancel(key)
+
+    def _decision_stats(self) -> str:
+        if self._decision_runner is None:
+            return "Shot deciders run inline, no latencies recorded"
+        return self._decision_runner.stats()
 
     def _verify_table_dimensions(self):
         widths: Set[float] = {
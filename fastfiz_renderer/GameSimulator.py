@@ -0,0 +1,147 @@
+import time
+from typing import Optional, Tuple, Union
+
+import fastfiz as ff
+
+import fastfiz_renderer.compiled_protos.api_pb2 as api_pb2
+
+from .GameArchive import GameArchiveWriter, IndexedGameArchiveWriter
+from .GameHandler import GameHandler
+from .TableStateCodec import TableStateCodec
+
+
+class GameSimulator:
+    # Plays GameHandler games without a window, a decider drives executeShot until it returns None,
+    # proposes an impossible shot, the cue ball is pocketed or max_turns is reached. Turns are recorded
+    # as GameTurns, games cut off at max_turns are counted in cut_off_games.
+    def __init__(self, agent_name: str = "Agent", delta_encode: bool = True, report_interval: Optional[int] = 100,
+                 max_turns: Optional[int] = 1000):
+        self.agent_name: str = agent_name
+        self.delta_encode: bool = delta_encode
+        self.report_interval: Optional[int] = report_interval
+        self.max_turns: Optional[int] = max_turns
+
+        self.games_per_second: float = 0
+        self.turns_per_second: float = 0
+        self.cut_off_games: int = 0
+
+    def simulate_game(self, game: GameHandler.Game) -> api_pb2.Game:
+        recorded_game, cut_off = self._simulate_game(game, self.delta_encode)
+        self.cut_off_games += cut_off
+        return recorded_game
+
+    def simulate_games(self, games: list[GameHandler.Game]) -> list[api_pb2.Game]:
+        return list(self._simulate_and_report(games, None))
+
+    def simulate_eight_ball_games(self, shot_deciders: list[GameHandler.ShotDecider]) -> list[api_pb2.Game]:
+        return self.simulate_games(self.racked_eight_ball_games(shot_deciders))
+
+    def record_games(self, games: list[GameHandler.Game], archive_path: str, indexed: bool = False) -> int:
+        # The plain archive streams into Server.serve_streamed_games, the indexed one into serve_indexed_archive
+        writer = IndexedGameArchiveWriter(archive_path) if indexed else GameArchiveWriter(archive_path)
+
+        with writer:
+            for _ in self._simulate_and_report(games, writer):
+                pass
+
+        return writer.game_count
+
+    def record_eight_ball_games(self, shot_deciders: list[GameHandler.ShotDecider], archive_path: str,
+                                indexed: bool = False) -> int:
+        return self.record_games(self.racked_eight_ball_games(shot_deciders), archive_path, indexed)
+
+    def _simulate_and_report(self, games: list[GameHandler.Game],
+                             writer: Optional[Union[GameArchiveWriter, IndexedGameArchiveWriter]]):
+        if not games:
+            raise Exception("No games provided!")
+
+        # The indexed writer stores expanded turns, delta encoding for it would only be undone
+        delta_encode = self.delta_encode and not isinstance(writer, IndexedGameArchiveWriter)
+
+        turn_count = 0
+        self.cut_off_games = 0
+        start = time.perf_counter()
+
+        for game_number, game in enumerate(games, start=1):
+            recorded_game, cut_off = self._simulate_game(game, delta_encode)
+            turn_count += len(recorded_game.turnHistory)
+            self.cut_off_games += cut_off
+
+            if writer is not None:
+                writer.write(recorded_game)
+            yield recorded_game
+
+            if self.report_interval and game_number % self.report_interval == 0:
+                self._update_rates(game_number, turn_count, start)
+                print(f"{game_number} / {len(games)} games, {self.games_per_second:.1f} games/s")
+
+        self._update_rates(len(games), turn_count, start)
+        print(f"Simulated {len(games)} games and {turn_count} turns, "
+              f"{self.games_per_second:.1f} games/s, {self.turns_per_second:.1f} turns/s, "
+              f"{self.cut_off_games} cut off")
+
+    def _simulate_game(self, game: GameHandler.Game, delta_encode: bool) -> Tuple[api_pb2.Game, bool]:
+        table_state, shot_decider = game
+        recorded_game = api_pb2.Game()
+        cut_off = False
+
+        while not table_state.getBall(ff.Ball.CUE).isPocketed():
+            # A decider that never clears the table would otherwise keep the game going forever
+            if self.max_turns is not None and len(recorded_game.turnHistory) >= self.max_turns:
+                cut_off = True
+                break
+
+            params = shot_decider(table_state)
+
+            if params is None or table_state.isPhysicallyPossible(params) != ff.TableState.OK_PRECONDITION:
+                break
+
+            before = TableStateCodec.from_ff_table_state(table_state)
+            table_state.executeShot(params)
+            after = TableStateCodec.from_ff_table_state(table_state)
+
+            self._record_turn(recorded_game, params, before, after, len(recorded_game.turnHistory) == 0)
+
+        if delta_encode:
+            recorded_game = TableStateCodec.delta_encode_game(recorded_game)
+        return recorded_game, cut_off
+
+    def _update_rates(self, game_count: int, turn_count: int, start: float):
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        self.games_per_second = game_count / elapsed
+        self.turns_per_second = turn_count / elapsed
+
+    def _record_turn(self, recorded_game: api_pb2.Game, params: ff.ShotParams, before, after, is_break: bool):
+        turn = recorded_game.turnHistory.add()
+        turn.turnType = "TT_BREAK" if is_break else "TT_NORMAL"
+        turn.agentName = self.agent_name
+        turn.shotResult = "SR_OK"
+
+        shot = turn.gameShot
+        shot.shotParams.a = params.a
+        shot.shotParams.b = params.b
+        shot.shotParams.theta = params.theta
+        shot.shotParams.phi = params.phi
+        shot.shotParams.v = params.v
+        shot.decision = "DEC_KEEP_SHOOTING"
+        # Deciders only return shot params, the required targets are left empty rather than made up
+        shot.ballTarget = ""
+        shot.pocketTarget = ""
+
+        numbers, _, positions = before
+        cue_idx = int((numbers == ff.Ball.CUE).nonzero()[0][0])
+        shot.cuePos.x, shot.cuePos.y = positions[cue_idx].tolist()
+
+        turn.packedTableStateBefore.CopyFrom(TableStateCodec.to_packed(*before))
+        turn.packedTableStateAfter.CopyFrom(TableStateCodec.to_packed(*after))
+        # Present but empty, as TableStateCodec.pack_game leaves them
+        turn.tableStateBefore.SetInParent()
+        turn.tableStateAfter.SetInParent()
+
+    @staticmethod
+    def racked_eight_ball_games(shot_deciders: list[GameHandler.ShotDecider]) -> list[GameHandler.Game]:
+        games: list[GameHandler.Game] = []
+        for decider in shot_deciders:
+            game_state: ff.GameState = ff.GameState.RackedState(ff.GT_EIGHTBALL)
+            games.append((game_state.tableState(), decider))
+        return games
@@ -1,21 +1,28 @@
-from typing import Tuple
+from collections import OrderedDict
+from typing import Tuple, Union
 
 import fastfiz as ff
 from p5 import *
+from p5.sketch.Skia2DRenderer.graphics import create_graphics_helper
 import vectormath as vmath
 import fastfiz_renderer.compiled_protos.api_pb2 as api_pb2
 
 from .GameBall import GameBall
+from .PlaybackClock import PlaybackClock
+from .ShotTrajectory import ShotTrajectory
+from .ShotTreeGeometry import ShotTreeGeometry
 
 
 class GameTable:
+    STATIC_LAYER_CACHE_SIZE = 16
+    _static_layer_cache: OrderedDict = OrderedDict()
+
     def __init__(self, width: float, length: float, side_pocket_width: float, corner_pocket_width: float,
                  rolling_friction_const: float, sliding_friction_const: float, gravitational_const: float,
-                 game_balls: list[GameBall], shot_speed_factor: float):
+                 game_balls: list[GameBall], shot_speed_factor: float, frames_per_second: Optional[int] = None):
         self.wood_width = width / 10
         self.rail_width = width / 30
-        self.width = width + 2 * self.wood_width + 2 * self.rail_width
-        self.length = length + 2 * self.wood_width + 2 * self.rail_width
+        self.width, self.length = GameTable.outer_size(width, length)
         self.board_width = width
         self.board_length = length
         self.side_pocket_width = side_pocket_width
@@ -37,14 +44,21 @@ class GameTable:
         self.sliding_friction_const = sliding_friction_const
         self.gravitational_const = gravitational_const
         self.game_balls = game_balls
+        self._balls_by_number: dict[int, GameBall] = {ball.number: ball for ball in game_balls}
+
+        self._shot_queue: list[Tuple[ff.ShotParams, ShotTrajectory, Callable[None, None]]] = []
+        self._active_shot: Optional[Tuple[ff.ShotParams, ShotTrajectory, Callable[None, None]]] = None
+        self.clock = PlaybackClock(shot_speed_factor, frames_per_second)
 
-        self._shot_queue: list[Tuple[ff.ShotParams, ff.Shot, Callable[None, None]]] = []
-        self._active_shot: Optional[Tuple[ff.ShotParams, ff.Shot, Callable[None, None]]] = None
-        self._active_shot_start_time: float = 0
-        self._shot_speed_factor = shot_speed_factor
+    @staticmethod
+    def outer_size(board_width: float, board_length: float) -> Tuple[float, float]:
+        wood_width = board_width / 10
+        rail_width = board_width / 30
+        return board_width + 2 * wood_width + 2 * rail_width, board_length + 2 * wood_width + 2 * rail_width
 
     @classmethod
-    def from_table_state(cls, table_state: ff.TableState, shot_speed_factor: float):
+    def from_table_state(cls, table_state: ff.TableState, shot_speed_factor: float,
+                         frames_per_second: Optional[int] = None):
         game_balls = []
 
         for i in range(ff.Ball.CUE, ff.Ball.FIFTEEN + 1):
@@ -55,18 +69,61 @@ class GameTable:
         table: ff.Table = table_state.getTable()
 
         return cls(table.TABLE_WIDTH, table.TABLE_LENGTH, table.SIDE_POCKET_WIDTH, table.CORNER_POCKET_WIDTH,
-                   table.MU_ROLLING, table.MU_SLIDING, table.g, game_balls, shot_speed_factor)
+                   table.MU_ROLLING, table.MU_SLIDING, table.g, game_balls, shot_speed_factor, frames_per_second)
 
     def draw(self, scaling=200, horizontal_mode=False, flipped=False, stroke_mode=False, stroke_weight=2,
              highlighted_balls: list[str] = [], highlighted_pockets: list[str] = [],
-             shot_params: Optional[api_pb2.ShotParams] = None, canvas=None):
+             shot_params: Optional[api_pb2.ShotParams] = None, canvas=None, use_static_cache=True):
 
         if canvas:
             old_canvas = p5.renderer
             p5.renderer = canvas
 
+        if use_static_cache:
+            image(self._get_static_layer(scaling, horizontal_mode, flipped, stroke_mode, stroke_weight,
+                                         highlighted_pockets), 0, 0)
+
         push()
+        self._apply_orientation(scaling, horizontal_mode, flipped)
+
+        if not use_static_cache:
+            self._draw_static_table(scaling, stroke_mode, stroke_weight, highlighted_pockets)
 
+        strokeWeight(stroke_weight)
+
+        if shot_params:
+            stroke(102, 142, 131) if not stroke_mode else stroke(*self.black_color)
+            strokeWeight(stroke_weight * 2)
+            for ball in self.game_balls:
+                if ball.number == 0 and ball.state == 1:
+                    push()
+                    translate((ball.position.x + self.rail_width + self.wood_width) * scaling,
+                              (ball.position.y + self.rail_width + self.wood_width) * scaling)
+                    push()
+                    rotate(shot_params.phi * PI / 180)
+                    length = GameBall.RADIUS * scaling + shot_params.v * scaling * 0.03
+                    line(0, 0, length, 0)
+                    pop()
+                    pop()
+                    break
+            strokeWeight(stroke_weight)
+
+        noStroke() if not stroke_mode else stroke(*self.black_color)
+
+        # Balls
+        push()
+        translate(int(self.board_pos * scaling),
+                  int(self.board_pos * scaling))
+        for ball in self.game_balls:
+            ball.draw(scaling, horizontal_mode, flipped, stroke_mode, highlighted_balls)
+        pop()
+
+        pop()
+
+        if canvas:
+            p5.renderer = old_canvas
+
+    def _apply_orientation(self, scaling, horizontal_mode, flipped):
         if horizontal_mode:
             rotate(PI / 2)
             translate(0, -int(self.length * scaling))
@@ -75,6 +132,40 @@ class GameTable:
             translate(0, int(self.length * scaling))
             scale(1, -1)
 
+    def _get_static_layer(self, scaling, horizontal_mode, flipped, stroke_mode, stroke_weight,
+                          highlighted_pockets: list[str]):
+        key = (self.board_width, self.board_length, self.side_pocket_width, self.corner_pocket_width, scaling,
+               horizontal_mode, flipped, stroke_mode, stroke_weight,
+               tuple(sorted(pocket for pocket in highlighted_pockets if pocket)))
+
+        layer = GameTable._static_layer_cache.get(key)
+        if layer is not None:
+            GameTable._static_layer_cache.move_to_end(key)
+            return layer
+
+        layer_width = ceil(self.width * scaling)
+        layer_length = ceil(self.length * scaling)
+        if horizontal_mode:
+            layer_width, layer_length = layer_length, layer_width
+
+        # Allocated without a running sketch as well, headless renderers and spawned workers share this cache
+        layer = create_graphics_helper(layer_width, layer_length)
+
+        old_canvas = p5.renderer
+        p5.renderer = layer.renderer
+        push()
+        self._apply_orientation(scaling, horizontal_mode, flipped)
+        self._draw_static_table(scaling, stroke_mode, stroke_weight, highlighted_pockets)
+        pop()
+        p5.renderer = old_canvas
+
+        GameTable._static_layer_cache[key] = layer
+        if len(GameTable._static_layer_cache) > GameTable.STATIC_LAYER_CACHE_SIZE:
+            GameTable._static_layer_cache.popitem(last=False)
+
+        return layer
+
+    def _draw_static_table(self, scaling, stroke_mode, stroke_weight, highlighted_pockets: list[str]):
         strokeWeight(stroke_weight)
         noStroke() if not stroke_mode else stroke(*self.black_color)
 
@@ -256,118 +347,59 @@ class GameTable:
         draw_corner_pocket(PI / 4 * 7, (self.wood_width * scaling, (self.wood_width + offset) * scaling),
                            SW_highlighted)  # SW
 
-        if shot_params:
-            stroke(102, 142, 131) if not stroke_mode else stroke(*self.black_color)
-            strokeWeight(stroke_weight * 2)
-            for ball in self.game_balls:
-                if ball.number == 0 and ball.state == 1:
-                    push()
-                    translate((ball.position.x + self.rail_width + self.wood_width) * scaling,
-                              (ball.position.y + self.rail_width + self.wood_width) * scaling)
-                    push()
-                    rotate(shot_params.phi * PI / 180)
-                    length = GameBall.RADIUS * scaling + shot_params.v * scaling * 0.03
-                    line(0, 0, length, 0)
-                    pop()
-                    pop()
-                    break
-            strokeWeight(stroke_weight)
-
-        noStroke() if not stroke_mode else stroke(*self.black_color)
 
-        # Balls
-        push()
-        translate(int(self.board_pos * scaling),
-                  int(self.board_pos * scaling))
-        for ball in self.game_balls:
-            ball.draw(scaling, horizontal_mode, flipped, stroke_mode, highlighted_balls)
-        pop()
+    def draw_shot_tree(self, shot_tree: Union[api_pb2.Shot, ShotTreeGeometry], scaling=200, horizontal_mode=False,
+                       flipped=False, stroke_weight=2, canvas=None, depth=1, draw_id_tags=True):
+        # Callers drawing the same tree every frame should pass a ShotTreeGeometry built once.
+        # depth only drove the old recursion, it is still accepted so existing calls keep working.
+        geometry = shot_tree if isinstance(shot_tree, ShotTreeGeometry) else ShotTreeGeometry.from_shot_tree(shot_tree)
+        circles, lines, label_anchors = geometry.scaled(scaling)
 
-        pop()
-
-        if canvas:
-            p5.renderer = old_canvas
-
-    def draw_shot_tree(self, shot_tree: api_pb2.Shot, scaling=200, horizontal_mode=False, flipped=False,
-                       stroke_weight=2, canvas=None, depth=1, draw_id_tags=True):
         if canvas:
             old_canvas = p5.renderer
             p5.renderer = canvas
 
         push()
-
-        if horizontal_mode:
-            rotate(PI / 2)
-            translate(0, -int(self.length * scaling))
-
-        if flipped:
-            translate(0, int(self.length * scaling))
-            scale(1, -1)
-
+        self._apply_orientation(scaling, horizontal_mode, flipped)
         translate(int(self.board_pos * scaling),
                   int(self.board_pos * scaling))
 
         strokeWeight(stroke_weight)
         noFill()
 
-        # Leftmost
-        lm = shot_tree.leftMost
-        stroke(*self.red_color) if flipped else stroke(*self.blue_color)
-        circle(lm.x * scaling, lm.y * scaling, GameBall.RADIUS * 2 * scaling)
-
-        # Rightmost
-        rm = shot_tree.rightMost
-        stroke(*self.blue_color) if flipped else stroke(*self.red_color)
-        circle(rm.x * scaling, rm.y * scaling, GameBall.RADIUS * 2 * scaling)
-
-        # GhostBall
-        rm = shot_tree.rightMost
-        stroke(*self.black_color)
-        circle(shot_tree.ghostBall.x * scaling, shot_tree.ghostBall.y * scaling, GameBall.RADIUS * 2 * scaling)
+        left_color, right_color = (self.red_color, self.blue_color) if flipped else (self.blue_color, self.red_color)
+        diameter = GameBall.RADIUS * 2 * scaling
+
+        for kind, color in ((ShotTreeGeometry.LEFT_MOST, left_color), (ShotTreeGeometry.RIGHT_MOST, right_color),
+                            (ShotTreeGeometry.GHOST_BALL, self.black_color)):
+            stroke(*color)
+            for x, y in circles[kind]:
+                circle(x, y, diameter)
+
+        # Segments leaving a rightmost point are drawn in the leftmost color and vice versa
+        for kind, color in ((ShotTreeGeometry.RIGHT_MOST, left_color), (ShotTreeGeometry.LEFT_MOST, right_color)):
+            stroke(*color)
+            for x1, y1, x2, y2 in lines[kind]:
+                line(x1, y1, x2, y2)
+
+        if draw_id_tags and label_anchors:
+            text_align(CENTER, CENTER)
+            ts = int(scaling / 30)
+            textSize(ts)
+            fill(*GameBall.ball_colors[ff.Ball.EIGHT])
+            noStroke()
 
-        if shot_tree.next.IsInitialized():
-            # Lines
-            stroke(*self.red_color) if flipped else stroke(*self.blue_color)
-            line(rm.x * scaling, rm.y * scaling, shot_tree.next.leftMost.x * scaling,
-                 shot_tree.next.leftMost.y * scaling)
-            stroke(*self.blue_color) if flipped else stroke(*self.red_color)
-            line(lm.x * scaling, lm.y * scaling, shot_tree.next.rightMost.x * scaling,
-                 shot_tree.next.rightMost.y * scaling)
-
-            if draw_id_tags:
-                # Id tag
-                stroke(*self.black_color)
+            for (x, y), label in zip(label_anchors, geometry.labels):
                 push()
-                text_x_pos = shot_tree.ghostBall.x * scaling + (shot_tree.next.ghostBall.x - shot_tree.ghostBall.x) * scaling / 2
-                text_y_pos = shot_tree.ghostBall.y * scaling + (shot_tree.next.ghostBall.y - shot_tree.ghostBall.y) * scaling / 2
-
-                mag = math.sqrt(text_x_pos**2 + text_y_pos**2)
-
-                offset_x = text_y_pos / mag * (scaling * 0.08)
-                offset_y = -text_x_pos / mag * (scaling * 0.08)
-
-                text_x_pos += offset_x
-                text_y_pos += offset_y
-
-                translate(int(text_x_pos), int(text_y_pos))
+                translate(x, y)
                 if horizontal_mode:
                     rotate(-PI / 2)
-
                 if flipped:
                     scale(1, -1)
-
-                text_align(CENTER, CENTER)
-                ts = int(scaling / 30)
-                textSize(ts)
-                fill(*GameBall.ball_colors[ff.Ball.EIGHT])
-                noStroke()
-                text(str(shot_tree.next.id), 0, ts * 0.80)
+                text(label, 0, ts * 0.80)
                 pop()
 
-            pop()
-            self.draw_shot_tree(shot_tree.next, scaling, horizontal_mode, flipped, stroke_weight, canvas, depth=depth+1, draw_id_tags=draw_id_tags)
-        else:
-            pop()
+        pop()
 
         if canvas:
             p5.renderer = old_canvas
@@ -376,15 +408,15 @@ class GameTable:
         if self._active_shot is None:
             if self._shot_queue:
                 self._active_shot = self._shot_queue.pop(0)
-                self._active_shot_start_time = time.time()
+                self.clock.start()
             else:
                 if shot_requester:
                     shot_requester()
                 return
 
-        time_since_shot_start = (time.time() - self._active_shot_start_time) * self._shot_speed_factor
+        time_since_shot_start = self.clock.shot_time()
 
-        if time_since_shot_start > self._active_shot[1].getDuration():
+        if time_since_shot_start > self._active_shot[1].duration:
             for ball in self.game_balls:
                 ball.force_to_end_of_shot_pos(self._active_shot[1])
             self._active_shot[2]()
@@ -392,10 +424,33 @@ class GameTable:
             return
 
         else:
-            for ball in self.game_balls:
-                ball.update(time_since_shot_start, self._active_shot[1], self.sliding_friction_const,
-                            self.rolling_friction_const,
-                            self.gravitational_const)
+            numbers, positions, velocities, states = self._active_shot[1].evaluate(
+                time_since_shot_start, self.sliding_friction_const, self.rolling_friction_const,
+                self.gravitational_const, GameBall.RADIUS)
+
+            for i, number in enumerate(numbers.tolist()):
+                ball = self._balls_by_number.get(number)
+                if ball:
+                    ball.position = positions[i]
+                    ball.velocity = velocities[i]
+                    ball.state = int(states[i])
+
+    def set_ball_states(self, table_state: ff.TableState):
+        for ball in self.game_balls:
+            ff_ball: ff.Ball = table_state.getBall(ball.number)
+            pos = ff_ball.getPos()
+            ball.position = vmath.Vector2(pos.x, pos.y)
+            ball.velocity = vmath.Vector2(0, 0)
+            ball.state = ff_ball.getState()
+
+    def set_shot_speed_factor(self, shot_speed_factor: float):
+        self.clock.set_speed_factor(shot_speed_factor)
+
+    def is_idle(self) -> bool:
+        return self._active_shot is None and not self._shot_queue
 
     def add_shot(self, params: ff.ShotParams, shot: ff.Shot, callback: Callable[None, None]):
-        self._shot_queue.append((params, shot, callback))
+        self.add_trajectory(params, ShotTrajectory.from_shot(shot), callback)
+
+    def add_trajectory(self, params: ff.ShotParams, trajectory: ShotTrajectory, callback: Callable[None, None]):
+        self._shot_queue.append((params, trajectory, callback))
@@ -0,0 +1,69 @@
+import os
+from typing import Optional
+
+import numpy as np
+import skia
+from p5.sketch.Skia2DRenderer.graphics import create_graphics_helper
+
+from .GameTable import GameTable
+from .PlaybackClock import PlaybackClock, FakeTimeSource
+
+
+class HeadlessRenderer:
+    def __init__(self, width: int, length: int):
+        self.width = width
+        self.length = length
+        self._buffer = create_graphics_helper(width, length)
+        self._time_source: Optional[FakeTimeSource] = None
+
+    @classmethod
+    def for_table(cls, game_table: GameTable, scaling: int, horizontal_mode: bool = False):
+        return cls._for_size(game_table.width, game_table.length, scaling, horizontal_mode)
+
+    @classmethod
+    def for_board(cls, board_width: float, board_length: float, scaling: int, horizontal_mode: bool = False):
+        # Sized like a GameTable for that board, without building one
+        return cls._for_size(*GameTable.outer_size(board_width, board_length), scaling, horizontal_mode)
+
+    @classmethod
+    def _for_size(cls, table_width: float, table_length: float, scaling: int, horizontal_mode: bool):
+        width = int(table_width * scaling)
+        length = int(table_length * scaling)
+
+        if horizontal_mode:
+            width, length = length, width
+
+        return cls(width, length)
+
+    @property
+    def canvas(self):
+        return self._buffer.renderer
+
+    def clear(self):
+        self._buffer.background(255)
+
+    def snapshot(self) -> skia.Image:
+        return self._buffer.surface.makeImageSnapshot()
+
+    def frame(self) -> np.ndarray:
+        return self.snapshot().toarray(colorType=skia.kRGBA_8888_ColorType)
+
+    def save_frame(self, path: str):
+        self.snapshot().save(path, skia.kPNG)
+
+    def collect(self, frames: list[np.ndarray], output_dir: Optional[str], file_name: str):
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+            self.save_frame(os.path.join(output_dir, file_name))
+        else:
+            frames.append(self.frame())
+
+    def advance_frame(self, game_table: GameTable, shot_speed_factor: float, frames_per_second: int):
+        # Every headless frame is exactly one frame of playback, so batches render as fast as they can be drawn
+        if self._time_source is None:
+            self._time_source = FakeTimeSource(frames_per_second)
+        else:
+            self._time_source.tick()
+
+        if game_table.clock.time_source is not self._time_source:
+            game_table.clock = PlaybackClock(shot_speed_factor, frames_per_second, self._time_source)
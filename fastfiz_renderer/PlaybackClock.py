@@ -0,0 +1,68 @@
+import math
+import time
+from typing import Callable, Optional
+
+
+class PlaybackClock:
+    # Tolerance for float round-off when counting how many whole steps have elapsed
+    _STEP_EPSILON = 1e-9
+
+    def __init__(
+            self,
+            speed_factor: float = 1,
+            frames_per_second: Optional[int] = None,
+            time_source: Callable[[], float] = time.monotonic,
+    ):
+        self.speed_factor = speed_factor
+        self.step: Optional[float] = 1 / frames_per_second if frames_per_second else None
+        self.time_source = time_source
+
+        self._shot_time: float = 0
+        self._last_time: float = 0
+        self._accumulator: float = 0
+
+    def start(self):
+        self._shot_time = 0
+        self._accumulator = 0
+        self._last_time = self.time_source()
+
+    def shot_time(self) -> float:
+        self._advance()
+        return self._shot_time
+
+    def set_speed_factor(self, speed_factor: float):
+        # Time elapsed so far is played at the old speed, so changing speed never moves the balls
+        self._advance()
+        self.speed_factor = speed_factor
+
+    def _advance(self):
+        now = self.time_source()
+        elapsed = max(now - self._last_time, 0)
+        self._last_time = now
+
+        if self.step is None:
+            self._shot_time += elapsed * self.speed_factor
+            return
+
+        # A long frame advances several whole steps at once, so playback skips ahead instead of lagging
+        self._accumulator += elapsed
+        steps = math.floor(self._accumulator / self.step + PlaybackClock._STEP_EPSILON)
+        if steps > 0:
+            self._accumulator = max(self._accumulator - steps * self.step, 0)
+            self._shot_time += steps * self.step * self.speed_factor
+
+
+class FakeTimeSource:
+    def __init__(self, frames_per_second: int = 60, start_time: float = 0):
+        self.frames_per_second = frames_per_second
+        self.frame_number = 0
+        self._offset = start_time
+
+    def __call__(self) -> float:
+        return self._offset + self.frame_number / self.frames_per_second
+
+    def tick(self, frames: int = 1):
+        self.frame_number += frames
+
+    def advance(self, seconds: float):
+        self._offset += seconds
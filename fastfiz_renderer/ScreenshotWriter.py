@@ -0,0 +1,71 @@
+import os
+import queue
+import threading
+import time
+from typing import Optional
+
+import skia
+from p5.sketch.Skia2DRenderer.graphics import create_graphics_helper
+
+from .GameTable import GameTable
+
+
+class ScreenshotWriter:
+    def __init__(self, screenshot_dir: str = ".", scaling: int = 2000, horizontal_mode: bool = False,
+                 max_pending: int = 8):
+        self.screenshot_dir = screenshot_dir
+        self.scaling = scaling
+        self.horizontal_mode = horizontal_mode
+
+        self._buffer = None
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._worker: Optional[threading.Thread] = None
+        self.dropped: int = 0
+
+    def get_buffer(self, game_table: GameTable):
+        # Allocated on first use, sessions that never take a screenshot never pay for the high-res buffer
+        if self._buffer is None:
+            width = int(game_table.width * self.scaling)
+            length = int(game_table.length * self.scaling)
+
+            if self.horizontal_mode:
+                width, length = length, width
+
+            self._buffer = create_graphics_helper(width, length)
+
+        return self._buffer
+
+    def capture(self, file_name: Optional[str] = None, block: bool = False) -> bool:
+        if self._buffer is None:
+            raise Exception("Nothing has been drawn to the screenshot buffer!")
+
+        if file_name is None:
+            file_name = time.strftime("%Y-%m-%d_%T") + ".png"
+
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._write_screenshots, daemon=True)
+            self._worker.start()
+
+        image = self._buffer.surface.makeImageSnapshot()
+        try:
+            self._queue.put((image, os.path.join(self.screenshot_dir, file_name)), block=block)
+        except queue.Full:
+            # The caller decides whether to retry or report, nothing is written for this capture
+            self.dropped += 1
+            return False
+
+        return True
+
+    def has_room(self) -> bool:
+        return not self._queue.full()
+
+    def _write_screenshots(self):
+        while True:
+            image, path = self._queue.get()
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                image.save(path, skia.kPNG)
+            except Exception as e:
+                print(f"Failed to save screenshot {path}: {e}")
+            finally:
+                self._queue.task_done()
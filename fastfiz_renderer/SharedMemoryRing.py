@@ -0,0 +1,116 @@
+import struct
+import time
+from multiprocessing import shared_memory
+from typing import Optional
+
+
+class SharedMemoryRing:
+    # Single producer, single consumer ring of length prefixed byte messages.
+    # The write and read counters only ever grow and each is stored by one side only, the
+    # aligned 8 byte stores they use are atomic on the platforms we run on.
+    _WRITE_POS = 0
+    _READ_POS = 64
+    _CAPACITY = 128
+    _HEADER_SIZE = 192
+    _POLL_INTERVAL = 0.0005
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self._shm = shm
+        self._owner = owner
+        self._buf = shm.buf
+        self.capacity: int = struct.unpack_from("<Q", self._buf, SharedMemoryRing._CAPACITY)[0]
+
+    @classmethod
+    def create(cls, capacity: int = 64 * 1024 * 1024):
+        shm = shared_memory.SharedMemory(create=True, size=SharedMemoryRing._HEADER_SIZE + capacity)
+        struct.pack_into("<Q", shm.buf, SharedMemoryRing._WRITE_POS, 0)
+        struct.pack_into("<Q", shm.buf, SharedMemoryRing._READ_POS, 0)
+        struct.pack_into("<Q", shm.buf, SharedMemoryRing._CAPACITY, capacity)
+        return cls(shm, True)
+
+    @classmethod
+    def attach(cls, name: str):
+        return cls(shared_memory.SharedMemory(name=name), False)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def closed(self) -> bool:
+        return self._buf is None
+
+    def write(self, payload: bytes, timeout: Optional[float] = None) -> bool:
+        return self.write_all([payload], timeout)
+
+    def write_all(self, payloads: list[bytes], timeout: Optional[float] = None) -> bool:
+        # All messages or none, the reader sees them once there is room for every one of them
+        records_size = sum(4 + len(payload) for payload in payloads)
+        if records_size > self.capacity:
+            raise Exception(f"Messages of {records_size} bytes do not fit in a ring of {self.capacity} bytes!")
+
+        write_pos = self._load(SharedMemoryRing._WRITE_POS)
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while self.capacity - (write_pos - self._load(SharedMemoryRing._READ_POS)) < records_size:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(SharedMemoryRing._POLL_INTERVAL)
+
+        pos = write_pos
+        for payload in payloads:
+            self._copy_in(pos, struct.pack("<I", len(payload)))
+            self._copy_in(pos + 4, payload)
+            pos += 4 + len(payload)
+        # Publishing the new write position last makes the whole batch visible at once
+        self._store(SharedMemoryRing._WRITE_POS, pos)
+        return True
+
+    def read(self, timeout: Optional[float] = None) -> Optional[bytes]:
+        read_pos = self._load(SharedMemoryRing._READ_POS)
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while self._load(SharedMemoryRing._WRITE_POS) == read_pos:
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(SharedMemoryRing._POLL_INTERVAL)
+
+        length = struct.unpack("<I", self._copy_out(read_pos, 4))[0]
+        payload = self._copy_out(read_pos + 4, length)
+        self._store(SharedMemoryRing._READ_POS, read_pos + 4 + length)
+        return payload
+
+    def close(self):
+        if self._buf is None:
+            return
+
+        self._buf = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+    def _load(self, offset: int) -> int:
+        return struct.unpack_from("<Q", self._buf, offset)[0]
+
+    def _store(self, offset: int, value: int):
+        struct.pack_into("<Q", self._buf, offset, value)
+
+    def _copy_in(self, pos: int, data: bytes):
+        data = memoryview(data)
+        start = pos % self.capacity
+        first = min(len(data), self.capacity - start)
+        base = SharedMemoryRing._HEADER_SIZE
+
+        self._buf[base + start:base + start + first] = data[:first]
+        if first < len(data):
+            self._buf[base:base + len(data) - first] = data[first:]
+
+    def _copy_out(self, pos: int, length: int) -> bytes:
+        start = pos % self.capacity
+        first = min(length, self.capacity - start)
+        base = SharedMemoryRing._HEADER_SIZE
+
+        data = bytes(self._buf[base + start:base + start + first])
+        if first < length:
+            data += bytes(self._buf[base:base + length - first])
+        return data
@@ -0,0 +1,113 @@
+import hashlib
+import os
+import pickle
+import struct
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import fastfiz as ff
+
+from .ShotTrajectory import ShotTrajectory
+
+
+class ShotCache:
+    def __init__(self, max_entries: int = 256, disk_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+
+        self._entries: OrderedDict[str, ShotTrajectory] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(table_state: ff.TableState, params: ff.ShotParams) -> str:
+        digest = hashlib.sha1()
+
+        for i in range(ff.Ball.CUE, ff.Ball.FIFTEEN + 1):
+            ball: ff.Ball = table_state.getBall(i)
+            pos = ball.getPos()
+            # Adding 0.0 folds -0.0 into 0.0 so equal positions always hash the same
+            digest.update(struct.pack("<iidd", i, ball.getState(), pos.x + 0.0, pos.y + 0.0))
+
+        digest.update(struct.pack("<5d", params.a + 0.0, params.b + 0.0, params.theta + 0.0, params.phi + 0.0,
+                                  params.v + 0.0))
+        return digest.hexdigest()
+
+    def execute(self, table_state: ff.TableState, params: ff.ShotParams) -> ShotTrajectory:
+        key = ShotCache.make_key(table_state, params)
+        trajectory = self.get(key)
+
+        if trajectory is None:
+            trajectory = ShotTrajectory.from_shot(table_state.executeShot(params))
+            self.put(key, trajectory)
+        else:
+            # executeShot leaves the table in its end state, a cache hit has to do the same
+            trajectory.apply_final_states(table_state)
+
+        return trajectory
+
+    def get(self, key: str) -> Optional[ShotTrajectory]:
+        with self._lock:
+            trajectory = self._entries.get(key)
+            if trajectory is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return trajectory
+
+        trajectory = self._load_from_disk(key)
+
+        with self._lock:
+            if trajectory is not None:
+                self.disk_hits += 1
+                self._store(key, trajectory)
+            else:
+                self.misses += 1
+
+        return trajectory
+
+    def put(self, key: str, trajectory: ShotTrajectory):
+        with self._lock:
+            self._store(key, trajectory)
+
+        self._save_to_disk(key, trajectory)
+
+    def stats(self) -> str:
+        return (f"Shot cache: {self.hits} hits, {self.disk_hits} disk hits, {self.misses} misses, "
+                f"{len(self._entries)} / {self.max_entries} entries")
+
+    def _store(self, key: str, trajectory: ShotTrajectory):
+        self._entries[key] = trajectory
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], key + ".pkl")
+
+    def _load_from_disk(self, key: str) -> Optional[ShotTrajectory]:
+        if not self.disk_dir:
+            return None
+
+        try:
+            with open(self._disk_path(key), "rb") as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _save_to_disk(self, key: str, trajectory: ShotTrajectory):
+        if not self.disk_dir:
+            return
+
+        path = self._disk_path(key)
+        if os.path.exists(path):
+            return
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(trajectory, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
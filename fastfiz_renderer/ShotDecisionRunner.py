@@ -0,0 +1,134 @@
+import multiprocessing
+import time
+from concurrent import futures
+from typing import Callable, Hashable, Optional, Tuple
+
+import fastfiz as ff
+import numpy as np
+
+from .TableStateCodec import TableStateArrays, TableStateCodec
+
+ShotDecider = Callable[[ff.TableState], Optional[ff.ShotParams]]
+
+
+def _decide_in_process(shot_decider: ShotDecider, table_state: TableStateArrays) -> Optional[Tuple[float, ...]]:
+    # Neither the table state nor the shot params pickle, both cross the process boundary as plain values
+    params = shot_decider(TableStateCodec.to_ff_table_state(table_state))
+    if params is None:
+        return None
+    return params.a, params.b, params.theta, params.phi, params.v
+
+
+class ShotDecisionRunner:
+    # Runs shot deciders off the draw thread. Decisions are keyed, one pending decision per key,
+    # and polled once per frame until they finish, fail or time out. The fallback decider then runs
+    # synchronously inside poll, i.e. on the draw thread, so it has to be cheap. A decider that timed
+    # out keeps its worker until it returns, max_workers has to leave room for such abandoned deciders.
+    def __init__(
+            self,
+            use_processes: bool = False,
+            max_workers: Optional[int] = None,
+            timeout: Optional[float] = None,
+            fallback_decider: Optional[ShotDecider] = None,
+    ):
+        self.use_processes: bool = use_processes
+        self.timeout: Optional[float] = timeout
+        self.fallback_decider: Optional[ShotDecider] = fallback_decider
+
+        self._max_workers = max_workers
+        self._pool: Optional[futures.Executor] = None
+        self._pending: dict[Hashable, Tuple[futures.Future, ff.TableState, float]] = {}
+
+        self.latencies: list[float] = []
+        self.timeouts: int = 0
+        self.failures: int = 0
+        self._abandoned: list[futures.Future] = []
+
+    def is_pending(self, key: Hashable = None) -> bool:
+        return key in self._pending
+
+    def submit(self, shot_decider: ShotDecider, table_state: ff.TableState, key: Hashable = None):
+        if key in self._pending:
+            raise Exception("A decision is already pending for this key!")
+
+        if self._pool is None:
+            # Spawned rather than forked, the viewer's window and any gRPC threads must not be inherited
+            self._pool = (futures.ProcessPoolExecutor(max_workers=self._max_workers,
+                                                      mp_context=multiprocessing.get_context("spawn"))
+                          if self.use_processes
+                          else futures.ThreadPoolExecutor(max_workers=self._max_workers,
+                                                          thread_name_prefix="ShotDecider"))
+
+        if self.use_processes:
+            future = self._pool.submit(_decide_in_process, shot_decider, TableStateCodec.from_ff_table_state(table_state))
+        else:
+            # A copy, a decider that times out keeps running while the draw thread goes on with the live state
+            table_state_copy = TableStateCodec.to_ff_table_state(TableStateCodec.from_ff_table_state(table_state))
+            future = self._pool.submit(shot_decider, table_state_copy)
+
+        self._pending[key] = (future, table_state, time.perf_counter())
+
+    def poll(self, key: Hashable = None) -> Tuple[bool, Optional[ff.ShotParams]]:
+        future, table_state, started_at = self._pending[key]
+        elapsed = time.perf_counter() - started_at
+
+        if not future.done():
+            if self.timeout is None or elapsed < self.timeout:
+                return False, None
+
+            # A decider that is already running can not be stopped, its late result is dropped
+            if not future.cancel():
+                self._abandoned.append(future)
+            del self._pending[key]
+            self.timeouts += 1
+            self.latencies.append(elapsed)
+            return True, self._fall_back(table_state)
+
+        del self._pending[key]
+        self.latencies.append(elapsed)
+
+        # Raising here would take down the p5 draw callback, a failed decider is treated like a late one
+        error = future.exception()
+        if error is not None:
+            self.failures += 1
+            print(f"Shot decider failed: {error!r}")
+            return True, self._fall_back(table_state)
+
+        params = future.result()
+
+        if self.use_processes and params is not None:
+            params = ff.ShotParams(*params)
+        return True, params
+
+    def _fall_back(self, table_state: ff.TableState) -> Optional[ff.ShotParams]:
+        return self.fallback_decider(table_state) if self.fallback_decider else None
+
+    def cancel(self, key: Hashable = None):
+        pending = self._pending.pop(key, None)
+        if pending and not pending[0].cancel():
+            self._abandoned.append(pending[0])
+
+    def cancel_all(self):
+        for key in list(self._pending):
+            self.cancel(key)
+
+    def shutdown(self):
+        self.cancel_all()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    @property
+    def abandoned(self) -> int:
+        # Timed out deciders still holding a worker
+        self._abandoned = [future for future in self._abandoned if not future.done()]
+        return len(self._abandoned)
+
+    def stats(self) -> str:
+        if not self.latencies:
+            return "No shot decisions made yet"
+
+        latencies = np.array(self.latencies) * 1000
+        return (f"Shot decisions: {len(latencies)}, {latencies.mean():.1f} ms mean, "
+                f"{np.percentile(latencies, 95):.1f} ms p95, {latencies.max():.1f} ms max, {self.timeouts} timeouts, "
+                f"{self.failures} failures, {self.abandoned} abandoned deciders still running")
@@ -0,0 +1,182 @@
+from bisect import bisect_right
+from typing import Optional, Tuple
+
+import fastfiz as ff
+import numpy as np
+import vectormath as vmath
+
+
+class ShotTrajectory:
+    def __init__(self, duration: float, ball_states: dict[int, list["_BallState"]]):
+        self.duration = duration
+        self._segments: dict[int, list[_BallState]] = {}
+        self._segment_times: dict[int, list[float]] = {}
+        self._final_states: dict[int, _BallState] = {}
+
+        for number, states in ball_states.items():
+            if not states:
+                continue
+
+            states = sorted(states, key=lambda s: s.e_time)
+            self._final_states[number] = states[-1]
+
+            # Of several states sharing an event time, the first one is the one played back
+            segments = [states[0]]
+            for state in states[1:]:
+                if state.e_time > segments[-1].e_time:
+                    segments.append(state)
+
+            self._segments[number] = segments
+            self._segment_times[number] = [state.e_time for state in segments]
+
+        # Padded (ball, segment) arrays for evaluating every ball of the shot in one pass
+        self.ball_numbers = np.array(sorted(self._segments), dtype=np.int32)
+        segment_count = max((len(segments) for segments in self._segments.values()), default=0)
+        ball_count = len(self.ball_numbers)
+
+        self._seg_times = np.full((ball_count, segment_count), np.inf)
+        self._seg_pos = np.zeros((ball_count, segment_count, 2))
+        self._seg_vel = np.zeros((ball_count, segment_count, 2))
+        self._seg_spin = np.zeros((ball_count, segment_count, 3))
+        self._seg_states = np.zeros((ball_count, segment_count), dtype=np.int32)
+
+        for row, number in enumerate(self.ball_numbers.tolist()):
+            for col, state in enumerate(self._segments[number]):
+                self._seg_times[row, col] = state.e_time
+                self._seg_pos[row, col] = state.pos
+                self._seg_vel[row, col] = state.vel
+                self._seg_spin[row, col] = state.ang_vel
+                self._seg_states[row, col] = state.state
+
+    @classmethod
+    def from_shot(cls, shot: ff.Shot):
+        ball_states: dict[int, list[_BallState]] = {}
+
+        for event in shot.getEventList():
+            event: ff.Event
+            ball1 = event.getBall1()
+            ball2 = event.getBall2()
+            if ff.Ball.CUE <= ball1 <= ff.Ball.FIFTEEN:
+                ball_states.setdefault(ball1, []).append(_BallState.from_event_and_ball(event, event.getBall1Data()))
+            if ff.Ball.CUE <= ball2 <= ff.Ball.FIFTEEN and ball2 != ball1:
+                ball_states.setdefault(ball2, []).append(_BallState.from_event_and_ball(event, event.getBall2Data()))
+
+        return cls(shot.getDuration(), ball_states)
+
+    def to_bytes(self) -> bytes:
+        # Raw arrays rather than a pickle, cheap to write into shared memory and to read back out
+        states = []
+        for number in self.ball_numbers.tolist():
+            states.extend((number, state) for state in self._segments[number])
+            if self._final_states[number] is not self._segments[number][-1]:
+                states.append((number, self._final_states[number]))
+
+        header = np.array([self.duration, len(states)], dtype=np.float64)
+        numbers = np.array([number for number, _ in states], dtype=np.int32)
+        ints = np.array([(state.state, state.event_course) for _, state in states], dtype=np.int32).reshape(-1, 2)
+        floats = np.array([(state.e_time, *state.pos, *state.vel, *state.ang_vel) for _, state in states],
+                          dtype=np.float64).reshape(-1, 8)
+        state_strs = "\0".join(state.state_str for _, state in states).encode()
+
+        return header.tobytes() + floats.tobytes() + numbers.tobytes() + ints.tobytes() + state_strs
+
+    @classmethod
+    def from_bytes(cls, data: bytes):
+        duration, count = np.frombuffer(data, dtype=np.float64, count=2)
+        count = int(count)
+        offset = 16
+        floats = np.frombuffer(data, dtype=np.float64, count=8 * count, offset=offset).reshape(-1, 8)
+        offset += floats.nbytes
+        numbers = np.frombuffer(data, dtype=np.int32, count=count, offset=offset)
+        offset += numbers.nbytes
+        ints = np.frombuffer(data, dtype=np.int32, count=2 * count, offset=offset).reshape(-1, 2)
+        offset += ints.nbytes
+        state_strs = bytes(data[offset:]).decode().split("\0") if count else []
+
+        ball_states: dict[int, list[_BallState]] = {}
+        for i, number in enumerate(numbers.tolist()):
+            e_time, px, py, vx, vy, wx, wy, wz = floats[i].tolist()
+            state, event_course = ints[i].tolist()
+            ball_states.setdefault(number, []).append(
+                _BallState(e_time, vmath.Vector2([px, py]), vmath.Vector2([vx, vy]), vmath.Vector3([wx, wy, wz]),
+                           state, state_strs[i], event_course)
+            )
+
+        return cls(float(duration), ball_states)
+
+    def get_state(self, ball_number: int, time_since_shot_start: float) -> Optional["_BallState"]:
+        times = self._segment_times.get(ball_number)
+        if not times:
+            return None
+
+        idx = bisect_right(times, time_since_shot_start)
+        return self._segments[ball_number][idx - 1] if idx else None
+
+    def get_final_state(self, ball_number: int) -> Optional["_BallState"]:
+        return self._final_states.get(ball_number)
+
+    def apply_final_states(self, table_state: ff.TableState):
+        for number, state in self._final_states.items():
+            table_state.setBall(number, state.state, state.pos.x, state.pos.y)
+
+    def evaluate(self, time_since_shot_start: float, sliding_friction_const: float, rolling_friction_const: float,
+                 gravitational_const: float, ball_radius: float
+                 ) -> Tuple[np.ndarray, vmath.Vector2Array, vmath.Vector2Array, np.ndarray]:
+        seg_idx = np.count_nonzero(self._seg_times <= time_since_shot_start, axis=1) - 1
+        rows = np.flatnonzero(seg_idx >= 0)
+        cols = seg_idx[rows]
+
+        pos = self._seg_pos[rows, cols]
+        vel = self._seg_vel[rows, cols]
+        spin = self._seg_spin[rows, cols]
+        states = self._seg_states[rows, cols]
+        delta_time = (time_since_shot_start - self._seg_times[rows, cols])[:, np.newaxis]
+
+        sliding = (states == ff.Ball.SLIDING)[:, np.newaxis]
+        rolling = (states == ff.Ball.ROLLING)[:, np.newaxis]
+
+        # Sliding balls decelerate along the contact point velocity v + R * (z x w), rolling balls along v
+        relative_vel = vel + ball_radius * np.stack((-spin[:, 1], spin[:, 0]), axis=1)
+        direction = np.where(sliding, relative_vel, vel)
+        length = np.linalg.norm(direction, axis=1, keepdims=True)
+        direction = np.divide(direction, length, out=np.zeros_like(direction), where=length > 0)
+
+        friction = np.where(sliding, sliding_friction_const, np.where(rolling, rolling_friction_const, 0))
+        deceleration = friction * gravitational_const * direction
+        moving = sliding | rolling
+
+        positions = pos + np.where(moving, vel * delta_time - 0.5 * deceleration * delta_time ** 2, 0)
+        velocities = np.where(moving, vel - deceleration * delta_time, vel)
+
+        return self.ball_numbers[rows], vmath.Vector2Array(positions), vmath.Vector2Array(velocities), states
+
+
+class _BallState:
+    def __init__(self, e_time: float, pos: vmath.Vector2, vel: vmath.Vector2, ang_vel: vmath.Vector3, state: int,
+                 state_str: str,
+                 event_course: int):
+        self.e_time = e_time
+        self.pos = pos
+        self.vel = vel
+        self.ang_vel = ang_vel
+        self.state = state
+        self.state_str = state_str
+        self.event_course = event_course
+
+    @classmethod
+    def from_event_and_ball(cls, event: ff.Event, ball: ff.Ball):
+        e_time = event.getTime()
+        pos = ball.getPos()
+        vel = ball.getVelocity()
+        ang_vel = ball.getSpin()
+        state = ball.getState()
+        state_str = ball.getStateString()
+        event_course = event.getType()
+        return cls(e_time, vmath.Vector2([pos.x, pos.y]), vmath.Vector2([vel.x, vel.y]),
+                   vmath.Vector3([ang_vel.x, ang_vel.y, ang_vel.z]), state, state_str, event_course)
+
+    def __str__(self):
+        return (f"Time: {self.e_time:.3f},\t "
+                f"Pos: ({self.pos.x:.3f}, {self.pos.y:.3f}),\t "
+                f"Vel: ({self.vel.x:.3f}, {self.vel.y:.3f}),\t "
+                f"State: {self.state_str}")
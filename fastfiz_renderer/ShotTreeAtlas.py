@@ -0,0 +1,105 @@
+import math
+import multiprocessing
+from concurrent import futures
+from typing import Optional
+
+import numpy as np
+import skia
+from p5 import *
+
+import fastfiz_renderer.compiled_protos.api_pb2 as api_pb2
+
+from .GameTable import GameTable
+from .HeadlessRenderer import HeadlessRenderer
+from .ShotTreeGeometry import ShotTreeGeometry
+from .TableStateCodec import AnyTableState, TableStateArrays, TableStateCodec
+
+
+def _render_thumbnails(table_state: TableStateArrays, shot_trees: list[bytes], first_idx: int, scaling: int,
+                       horizontal_mode: bool, flipped: bool, stroke_mode: bool) -> np.ndarray:
+    game_table = GameTable.from_table_state(TableStateCodec.to_ff_table_state(table_state), 1)
+    renderer = HeadlessRenderer.for_table(game_table, scaling, horizontal_mode)
+    thumbnails = np.empty((len(shot_trees), renderer.length, renderer.width, 4), dtype=np.uint8)
+
+    for i, shot_tree in enumerate(shot_trees):
+        renderer.clear()
+        game_table.draw(scaling, horizontal_mode, flipped, stroke_mode, 1, canvas=renderer.canvas)
+        game_table.draw_shot_tree(ShotTreeGeometry.from_shot_tree(api_pb2.Shot.FromString(shot_tree)), scaling,
+                                  horizontal_mode, flipped, 1, canvas=renderer.canvas, draw_id_tags=False)
+        _draw_index(renderer, first_idx + i + 1)
+        thumbnails[i] = renderer.frame()
+
+    return thumbnails
+
+
+def _draw_index(renderer: HeadlessRenderer, number: int):
+    old_canvas = p5.renderer
+    p5.renderer = renderer.canvas
+
+    ts = max(int(min(renderer.width, renderer.length) / 6), 8)
+    textSize(ts)
+    text_align(LEFT, TOP)
+    fill(255)
+    noStroke()
+    text(str(number), ts / 4, ts / 4)
+
+    p5.renderer = old_canvas
+
+
+class ShotTreeAtlas:
+    # Renders every shot tree of a ShowShots request as a small thumbnail on worker processes
+    # and tiles them row by row into one RGBA contact sheet, thumbnails are numbered from 1.
+    def __init__(
+            self,
+            scaling: int = 40,
+            columns: int = 8,
+            max_workers: Optional[int] = None,
+            trees_per_task: int = 16,
+            horizontal_mode: bool = False,
+            flipped: bool = False,
+            stroke_mode: bool = False,
+    ):
+        if columns < 1 or trees_per_task < 1:
+            raise Exception("Atlas needs at least one column and one tree per task!")
+
+        self.scaling: int = scaling
+        self.columns: int = columns
+        self.max_workers: Optional[int] = max_workers
+        self.trees_per_task: int = trees_per_task
+        self.horizontal_mode: bool = horizontal_mode
+        self.flipped: bool = flipped
+        self.stroke_mode: bool = stroke_mode
+
+    def render_thumbnails(self, shot_trees: list[api_pb2.Shot], table_state: AnyTableState) -> np.ndarray:
+        if not shot_trees:
+            raise Exception("No shot trees provided!")
+
+        arrays = TableStateCodec.to_arrays(table_state)
+        serialized = [shot_tree.SerializeToString() for shot_tree in shot_trees]
+
+        # Spawned rather than forked, a child must not inherit the viewer's window and GL state
+        context = multiprocessing.get_context("spawn")
+        with futures.ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context) as pool:
+            chunks = [
+                pool.submit(_render_thumbnails, arrays, serialized[start:start + self.trees_per_task], start,
+                            self.scaling, self.horizontal_mode, self.flipped, self.stroke_mode)
+                for start in range(0, len(serialized), self.trees_per_task)
+            ]
+            return np.concatenate([chunk.result() for chunk in chunks])
+
+    def render(self, shot_trees: list[api_pb2.Shot], table_state: AnyTableState) -> np.ndarray:
+        thumbnails = self.render_thumbnails(shot_trees, table_state)
+        count, height, width, channels = thumbnails.shape
+
+        columns = min(self.columns, count)
+        rows = math.ceil(count / columns)
+        padded = np.full((rows * columns, height, width, channels), 255, dtype=np.uint8)
+        padded[:count] = thumbnails
+
+        return padded.reshape(rows, columns, height, width, channels).swapaxes(1, 2).reshape(
+            rows * height, columns * width, channels)
+
+    def save(self, shot_trees: list[api_pb2.Shot], table_state: AnyTableState, path: str) -> np.ndarray:
+        atlas = self.render(shot_trees, table_state)
+        skia.Image.fromarray(atlas, colorType=skia.kRGBA_8888_ColorType).save(path, skia.kPNG)
+        return atlas
@@ -0,0 +1,86 @@
+import numpy as np
+
+import fastfiz_renderer.compiled_protos.api_pb2 as api_pb2
+
+
+class ShotTreeGeometry:
+    # A shot tree flattened once into board-unit arrays, covering both next and branch children.
+    # Circles are (n, 2) centers, lines (m, 4) segments and labels (k, 2) anchors, each split by
+    # kind so a draw only needs one stroke change per kind.
+    LEFT_MOST = 0
+    RIGHT_MOST = 1
+    GHOST_BALL = 2
+    LABEL_OFFSET = 0.08
+
+    def __init__(self, circles: np.ndarray, circle_kinds: np.ndarray, lines: np.ndarray, line_kinds: np.ndarray,
+                 label_anchors: np.ndarray, labels: list[str]):
+        self.circles: np.ndarray = circles
+        self.circle_kinds: np.ndarray = circle_kinds
+        self.lines: np.ndarray = lines
+        self.line_kinds: np.ndarray = line_kinds
+        self.label_anchors: np.ndarray = label_anchors
+        self.labels: list[str] = labels
+        self._scaled: dict = {}
+
+    @classmethod
+    def from_shot_tree(cls, shot_tree: api_pb2.Shot):
+        circles: list[tuple] = []
+        circle_kinds: list[int] = []
+        lines: list[tuple] = []
+        line_kinds: list[int] = []
+        label_anchors: list[tuple] = []
+        labels: list[str] = []
+
+        stack = [shot_tree]
+        while stack:
+            node = stack.pop()
+            lm, rm, ghost = node.leftMost, node.rightMost, node.ghostBall
+
+            circles.extend(((lm.x, lm.y), (rm.x, rm.y), (ghost.x, ghost.y)))
+            circle_kinds.extend((cls.LEFT_MOST, cls.RIGHT_MOST, cls.GHOST_BALL))
+
+            for field in ("branch", "next"):
+                if not node.HasField(field):
+                    continue
+                child = getattr(node, field)
+
+                lines.append((rm.x, rm.y, child.leftMost.x, child.leftMost.y))
+                line_kinds.append(cls.RIGHT_MOST)
+                lines.append((lm.x, lm.y, child.rightMost.x, child.rightMost.y))
+                line_kinds.append(cls.LEFT_MOST)
+
+                label_anchors.append(((ghost.x + child.ghostBall.x) / 2, (ghost.y + child.ghostBall.y) / 2))
+                labels.append(str(child.id))
+                stack.append(child)
+
+        label_anchors = np.array(label_anchors, dtype=np.float64).reshape(-1, 2)
+        # The tag sits beside the segment, perpendicular to its midpoint's direction from the board corner
+        mag = np.linalg.norm(label_anchors, axis=1, keepdims=True)
+        mag[mag == 0] = 1
+        offsets = np.column_stack((label_anchors[:, 1], -label_anchors[:, 0])) / mag * cls.LABEL_OFFSET
+
+        return cls(
+            np.array(circles, dtype=np.float64).reshape(-1, 2),
+            np.array(circle_kinds, dtype=np.int8),
+            np.array(lines, dtype=np.float64).reshape(-1, 4),
+            np.array(line_kinds, dtype=np.int8),
+            label_anchors + offsets,
+            labels,
+        )
+
+    def scaled(self, scaling: float) -> tuple:
+        # Scaled coordinates as plain lists grouped by kind, kept for the last few scalings
+        scaled = self._scaled.get(scaling)
+        if scaled is None:
+            circles = {kind: (self.circles[self.circle_kinds == kind] * scaling).tolist()
+                       for kind in (self.LEFT_MOST, self.RIGHT_MOST, self.GHOST_BALL)}
+            lines = {kind: (self.lines[self.line_kinds == kind] * scaling).tolist()
+                     for kind in (self.LEFT_MOST, self.RIGHT_MOST)}
+            label_anchors = (self.label_anchors * scaling).astype(np.int64).tolist()
+
+            scaled = (circles, lines, label_anchors)
+            if len(self._scaled) >= 4:
+                self._scaled.pop(next(iter(self._scaled)))
+            self._scaled[scaling] = scaled
+
+        return scaled
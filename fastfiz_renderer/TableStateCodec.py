@@ -0,0 +1,213 @@
+from typing import Iterator, Optional, Tuple, Union
+
+import fastfiz as ff
+import numpy as np
+
+import fastfiz_renderer.compiled_protos.api_pb2 as api_pb2
+
+AnyTableState = Union[api_pb2.TableState, api_pb2.PackedTableState]
+TableStateArrays = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+class TableStateCodec:
+    # Arrays are (numbers int32 (n,), states int32 (n,), positions float64 (n, 2))
+
+    @staticmethod
+    def to_arrays(table_state: AnyTableState) -> TableStateArrays:
+        if isinstance(table_state, api_pb2.PackedTableState):
+            numbers = np.array(table_state.numbers, dtype=np.int32)
+            states = np.array(table_state.states, dtype=np.int32)
+            positions = np.array(table_state.positions, dtype=np.float64).reshape(-1, 2)
+
+            if not len(numbers) == len(states) == len(positions):
+                raise Exception("Packed table state has mismatched array lengths!")
+            return numbers, states, positions
+
+        balls = table_state.balls
+        numbers = np.fromiter((ball.number for ball in balls), dtype=np.int32, count=len(balls))
+        states = np.fromiter((ball.state for ball in balls), dtype=np.int32, count=len(balls))
+        positions = np.fromiter((c for ball in balls for c in (ball.pos.x, ball.pos.y)), dtype=np.float64,
+                                count=2 * len(balls)).reshape(-1, 2)
+        return numbers, states, positions
+
+    @staticmethod
+    def to_packed(numbers: np.ndarray, states: np.ndarray, positions: np.ndarray) -> api_pb2.PackedTableState:
+        packed = api_pb2.PackedTableState()
+        packed.numbers.extend(np.asarray(numbers, dtype=np.int32).tolist())
+        packed.states.extend(np.asarray(states, dtype=np.int32).tolist())
+        packed.positions.extend(np.asarray(positions, dtype=np.float64).ravel().tolist())
+        return packed
+
+    @staticmethod
+    def to_table_state(numbers: np.ndarray, states: np.ndarray, positions: np.ndarray) -> api_pb2.TableState:
+        table_state = api_pb2.TableState()
+        for number, state, (x, y) in zip(numbers.tolist(), states.tolist(), positions.tolist()):
+            table_state.balls.add(number=number, state=state, pos=api_pb2.Point(x=x, y=y))
+        return table_state
+
+    @staticmethod
+    def pack(table_state: AnyTableState) -> api_pb2.PackedTableState:
+        if isinstance(table_state, api_pb2.PackedTableState):
+            return table_state
+        return TableStateCodec.to_packed(*TableStateCodec.to_arrays(table_state))
+
+    @staticmethod
+    def unpack(table_state: AnyTableState) -> api_pb2.TableState:
+        if isinstance(table_state, api_pb2.TableState):
+            return table_state
+        return TableStateCodec.to_table_state(*TableStateCodec.to_arrays(table_state))
+
+    @staticmethod
+    def to_ff_table_state(table_state: Union[AnyTableState, TableStateArrays]) -> ff.TableState:
+        numbers, states, positions = (
+            table_state if isinstance(table_state, tuple) else TableStateCodec.to_arrays(table_state)
+        )
+
+        ff_table_state = ff.TableState()
+        for number, state, (x, y) in zip(numbers.tolist(), states.tolist(), positions.tolist()):
+            ff_table_state.setBall(number, state, x, y)
+        return ff_table_state
+
+    @staticmethod
+    def from_ff_table_state(ff_table_state: ff.TableState) -> TableStateArrays:
+        numbers = np.arange(ff.Ball.CUE, ff.Ball.FIFTEEN + 1, dtype=np.int32)
+        states = np.empty(len(numbers), dtype=np.int32)
+        positions = np.empty((len(numbers), 2), dtype=np.float64)
+
+        for i, number in enumerate(numbers.tolist()):
+            ball: ff.Ball = ff_table_state.getBall(number)
+            pos = ball.getPos()
+            states[i] = ball.getState()
+            positions[i] = pos.x, pos.y
+
+        return numbers, states, positions
+
+    @staticmethod
+    def table_state_before(turn: api_pb2.GameTurn) -> AnyTableState:
+        return turn.packedTableStateBefore if turn.HasField("packedTableStateBefore") else turn.tableStateBefore
+
+    @staticmethod
+    def table_state_after(turn: api_pb2.GameTurn) -> AnyTableState:
+        return turn.packedTableStateAfter if turn.HasField("packedTableStateAfter") else turn.tableStateAfter
+
+    @staticmethod
+    def pack_game(game: api_pb2.Game) -> api_pb2.Game:
+        packed_game = api_pb2.Game()
+
+        for turn in game.turnHistory:
+            packed_turn = packed_game.turnHistory.add()
+            packed_turn.CopyFrom(turn)
+            packed_turn.packedTableStateBefore.CopyFrom(TableStateCodec.pack(TableStateCodec.table_state_before(turn)))
+            packed_turn.packedTableStateAfter.CopyFrom(TableStateCodec.pack(TableStateCodec.table_state_after(turn)))
+            # The required legacy fields stay present but empty, old readers see no balls instead of failing to parse
+            packed_turn.tableStateBefore.Clear()
+            packed_turn.tableStateAfter.Clear()
+
+        return packed_game
+
+    @staticmethod
+    def is_delta_encoded(game: api_pb2.Game) -> bool:
+        return game.HasField("keyframe")
+
+    @staticmethod
+    def apply_delta(base: TableStateArrays, delta: TableStateArrays) -> TableStateArrays:
+        numbers, states, positions = (array.copy() for array in base)
+        delta_numbers, delta_states, delta_positions = delta
+
+        matches = numbers[:, None] == delta_numbers[None, :]
+        base_idx, delta_idx = np.nonzero(matches)
+        states[base_idx] = delta_states[delta_idx]
+        positions[base_idx] = delta_positions[delta_idx]
+
+        added = ~matches.any(axis=0)
+        if added.any():
+            numbers = np.concatenate((numbers, delta_numbers[added]))
+            states = np.concatenate((states, delta_states[added]))
+            positions = np.concatenate((positions, delta_positions[added]))
+
+        return numbers, states, positions
+
+    @staticmethod
+    def diff(before: TableStateArrays, after: TableStateArrays) -> Optional[TableStateArrays]:
+        # None when after can not be expressed as before plus changed balls, i.e. a ball disappeared
+        before_numbers, before_states, before_positions = before
+        after_numbers, after_states, after_positions = after
+
+        matches = after_numbers[:, None] == before_numbers[None, :]
+        if not matches.any(axis=0).all():
+            return None
+
+        after_idx, before_idx = np.nonzero(matches)
+        changed = np.ones(len(after_numbers), dtype=bool)
+        changed[after_idx] = ((after_states[after_idx] != before_states[before_idx]) |
+                              (after_positions[after_idx] != before_positions[before_idx]).any(axis=1))
+
+        return after_numbers[changed], after_states[changed], after_positions[changed]
+
+    @staticmethod
+    def iter_game_states(game: api_pb2.Game) -> Iterator[Tuple[TableStateArrays, TableStateArrays]]:
+        if not TableStateCodec.is_delta_encoded(game):
+            for turn in game.turnHistory:
+                yield (TableStateCodec.to_arrays(TableStateCodec.table_state_before(turn)),
+                       TableStateCodec.to_arrays(TableStateCodec.table_state_after(turn)))
+            return
+
+        previous_after = TableStateCodec.to_arrays(game.keyframe)
+        for turn in game.turnHistory:
+            if turn.HasField("packedTableStateBefore"):
+                before = TableStateCodec.to_arrays(turn.packedTableStateBefore)
+            else:
+                before = previous_after
+
+            if turn.HasField("packedTableStateAfter"):
+                after = TableStateCodec.to_arrays(turn.packedTableStateAfter)
+            else:
+                after = TableStateCodec.apply_delta(before, TableStateCodec.to_arrays(turn.afterDelta))
+
+            yield before, after
+            previous_after = after
+
+    @staticmethod
+    def delta_encode_game(game: api_pb2.Game) -> api_pb2.Game:
+        delta_game = api_pb2.Game()
+        previous_after: Optional[TableStateArrays] = None
+
+        for turn, (before, after) in zip(game.turnHistory, TableStateCodec.iter_game_states(game)):
+            delta_turn = delta_game.turnHistory.add()
+            delta_turn.CopyFrom(turn)
+            for field in ("packedTableStateBefore", "packedTableStateAfter", "afterDelta"):
+                delta_turn.ClearField(field)
+            delta_turn.tableStateBefore.Clear()
+            delta_turn.tableStateAfter.Clear()
+
+            if previous_after is None:
+                delta_game.keyframe.CopyFrom(TableStateCodec.to_packed(*before))
+            elif not TableStateCodec._arrays_equal(previous_after, before):
+                delta_turn.packedTableStateBefore.CopyFrom(TableStateCodec.to_packed(*before))
+
+            delta = TableStateCodec.diff(before, after)
+            if delta is None:
+                delta_turn.packedTableStateAfter.CopyFrom(TableStateCodec.to_packed(*after))
+            else:
+                delta_turn.afterDelta.CopyFrom(TableStateCodec.to_packed(*delta))
+
+            previous_after = after
+
+        return delta_game
+
+    @staticmethod
+    def expand_delta_game(game: api_pb2.Game):
+        # Rebuilds every turn's packed states in place, afterwards the game reads like any other
+        if not TableStateCodec.is_delta_encoded(game):
+            return
+
+        for turn, (before, after) in zip(game.turnHistory, list(TableStateCodec.iter_game_states(game))):
+            turn.packedTableStateBefore.CopyFrom(TableStateCodec.to_packed(*before))
+            turn.packedTableStateAfter.CopyFrom(TableStateCodec.to_packed(*after))
+            turn.ClearField("afterDelta")
+
+        game.ClearField("keyframe")
+
+    @staticmethod
+    def _arrays_equal(a: TableStateArrays, b: TableStateArrays) -> bool:
+        return all(np.array_equal(x, y) for x, y in zip(a, b))
@@ -0,0 +1,154 @@
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent import futures
+from typing import Callable, Optional, Tuple
+
+import fastfiz as ff
+
+import fastfiz_renderer.compiled_protos.api_pb2 as api_pb2
+
+from .GameArchive import GameArchiveWriter, IndexedGameArchiveWriter
+from .GameHandler import GameHandler
+from .GameSimulator import GameSimulator
+from .TableStateCodec import TableStateArrays, TableStateCodec
+
+
+def _play_game(table_state: TableStateArrays, shot_decider: GameHandler.ShotDecider, agent_name: str,
+               delta_encode: bool, max_turns: Optional[int]) -> Tuple[bytes, bool, int, bool, float]:
+    start = time.perf_counter()
+    ff_table_state = TableStateCodec.to_ff_table_state(table_state)
+    simulator = GameSimulator(agent_name, delta_encode, None, max_turns)
+    game = simulator.simulate_game((ff_table_state, shot_decider))
+
+    cue_ball_pocketed = ff_table_state.getBall(ff.Ball.CUE).isPocketed()
+    balls_pocketed = sum(ff_table_state.getBall(i).isPocketed() for i in range(ff.Ball.ONE, ff.Ball.FIFTEEN + 1))
+    # Serialized here, a Game pickles far slower than its bytes
+    return (game.SerializeToString(), cue_ball_pocketed, balls_pocketed, simulator.cut_off_games > 0,
+            time.perf_counter() - start)
+
+
+class TournamentRunner:
+    # Plays GameHandler games on a process pool, one game per task. Table states travel as
+    # TableStateCodec arrays and deciders must be picklable, i.e. module level functions.
+    # Finished games are written to the archive in game order while later games still run.
+
+    class GameResult:
+        def __init__(self, game_idx: int, turn_count: int, cue_ball_pocketed: bool, balls_pocketed: int,
+                     cut_off: bool, duration: float):
+            self.game_idx: int = game_idx
+            self.turn_count: int = turn_count
+            self.cue_ball_pocketed: bool = cue_ball_pocketed
+            self.balls_pocketed: int = balls_pocketed
+            self.cut_off: bool = cut_off
+            self.duration: float = duration
+
+    PlaybackFilter = Callable[[GameResult, api_pb2.Game], bool]
+
+    def __init__(
+            self,
+            max_workers: Optional[int] = None,
+            agent_name: str = "Agent",
+            delta_encode: bool = True,
+            max_pending_games: Optional[int] = None,
+            playback_count: int = 0,
+            playback_filter: Optional[PlaybackFilter] = None,
+            report_interval: Optional[int] = 100,
+            max_turns: Optional[int] = 1000,
+    ):
+        self.max_workers: Optional[int] = max_workers
+        self.agent_name: str = agent_name
+        self.delta_encode: bool = delta_encode
+        self.max_pending_games: Optional[int] = max_pending_games
+        self.playback_count: int = playback_count
+        self.playback_filter: Optional[TournamentRunner.PlaybackFilter] = playback_filter
+        self.report_interval: Optional[int] = report_interval
+        self.max_turns: Optional[int] = max_turns
+
+        self.results: list[TournamentRunner.GameResult] = []
+        self.playback_games: list[api_pb2.Game] = []
+        self.games_per_second: float = 0
+
+    def run(self, games: list[GameHandler.Game], archive_path: Optional[str] = None, indexed: bool = False,
+            playback_handler=None) -> list[GameResult]:
+        # playback_handler is anything with publish_appended_games, a ShowGameServiceHandler or a RenderProcess
+        if not games:
+            raise Exception("No games provided!")
+
+        self.results = []
+        self.playback_games = []
+        delta_encode = self.delta_encode and not indexed
+        writer = None
+        if archive_path is not None:
+            writer = IndexedGameArchiveWriter(archive_path) if indexed else GameArchiveWriter(archive_path)
+
+        unpublished: deque[api_pb2.Game] = deque()
+        start = time.perf_counter()
+
+        context = multiprocessing.get_context("spawn")
+        with futures.ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context) as pool:
+            max_pending = self.max_pending_games or (self.max_workers or os.cpu_count() or 1) * 4
+            pending: deque[futures.Future] = deque()
+            next_game_idx = 0
+
+            try:
+                while pending or next_game_idx < len(games):
+                    while next_game_idx < len(games) and len(pending) < max_pending:
+                        table_state, shot_decider = games[next_game_idx]
+                        pending.append(pool.submit(_play_game, TableStateCodec.from_ff_table_state(table_state),
+                                                   shot_decider, self.agent_name, delta_encode, self.max_turns))
+                        next_game_idx += 1
+
+                    # Waiting on the oldest game keeps the archive in game order
+                    game_bytes, cue_ball_pocketed, balls_pocketed, cut_off, duration = pending.popleft().result()
+                    game = api_pb2.Game.FromString(game_bytes)
+                    result = TournamentRunner.GameResult(len(self.results), len(game.turnHistory),
+                                                         cue_ball_pocketed, balls_pocketed, cut_off, duration)
+                    self.results.append(result)
+
+                    if writer is not None:
+                        writer.write(game)
+                    if self._queue_for_playback(result, game):
+                        unpublished.append(game)
+                    self._publish(playback_handler, unpublished, 0)
+
+                    if self.report_interval and len(self.results) % self.report_interval == 0:
+                        self._report(len(games), start)
+            finally:
+                for future in pending:
+                    future.cancel()
+                if writer is not None:
+                    writer.close()
+
+        self._publish(playback_handler, unpublished, None)
+        if not self.report_interval or len(games) % self.report_interval:
+            self._report(len(games), start)
+        return self.results
+
+    def run_eight_ball(self, shot_deciders: list[GameHandler.ShotDecider], archive_path: Optional[str] = None,
+                       indexed: bool = False, playback_handler=None) -> list[GameResult]:
+        return self.run(GameSimulator.racked_eight_ball_games(shot_deciders), archive_path, indexed, playback_handler)
+
+    def _queue_for_playback(self, result: GameResult, game: api_pb2.Game) -> bool:
+        if len(self.playback_games) >= self.playback_count:
+            return False
+        if self.playback_filter is not None and not self.playback_filter(result, game):
+            return False
+
+        self.playback_games.append(game)
+        return True
+
+    @staticmethod
+    def _publish(playback_handler, unpublished: deque, timeout: Optional[float]):
+        # While games are running a full viewer queue only defers playback, it must not stall the pool
+        while playback_handler is not None and unpublished:
+            if not playback_handler.publish_appended_games([unpublished[0]], timeout=timeout):
+                return
+            unpublished.popleft()
+
+    def _report(self, game_count: int, start: float):
+        self.games_per_second = len(self.results) / max(time.perf_counter() - start, 1e-9)
+        print(f"{len(self.results)} / {game_count} games, {self.games_per_second:.1f} games/s, "
+              f"{sum(result.cut_off for result in self.results)} cut off, "
+              f"{len(self.playback_games)} queued for playback")
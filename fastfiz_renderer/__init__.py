@@ -1,16 +1,50 @@
 from .GameBall import GameBall
+from .ShotTrajectory import ShotTrajectory
+from .ShotTreeGeometry import ShotTreeGeometry
+from .ShotTreeAtlas import ShotTreeAtlas
+from .TableStateCodec import TableStateCodec
+from .PlaybackClock import PlaybackClock, FakeTimeSource
+from .ShotCache import ShotCache
+from .ShotDecisionRunner import ShotDecisionRunner
 from .GameTable import GameTable
 from .GameHandler import GameHandler
+from .HeadlessRenderer import HeadlessRenderer
+from .GameExporter import GameExporter
+from .GameSimulator import GameSimulator
+from .TournamentRunner import TournamentRunner
+from .SharedMemoryRing import SharedMemoryRing
+from .GameArchive import GameArchiveReader, GameArchiveWriter, IndexedGameArchive, IndexedGameArchiveWriter
 from .GRPC.ShowShotsServiceHandler import ShowShotsServiceHandler
 from .GRPC.ShowGameServiceHandler import ShowGameServiceHandler
 from .GRPC.Server import Server
+from .GRPC.AsyncServer import AsyncServer
+from .GRPC.RenderProcess import RenderProcess
 
 __all__ = [
     "GameBall",
+    "ShotTrajectory",
+    "ShotTreeGeometry",
+    "ShotTreeAtlas",
+    "TableStateCodec",
+    "PlaybackClock",
+    "FakeTimeSource",
+    "ShotCache",
+    "ShotDecisionRunner",
     "GameTable",
     "GameHandler",
+    "HeadlessRenderer",
+    "GameExporter",
+    "GameSimulator",
+    "TournamentRunner",
+    "SharedMemoryRing",
+    "GameArchiveReader",
+    "GameArchiveWriter",
+    "IndexedGameArchive",
+    "IndexedGameArchiveWriter",
     "ServerHandler",
     "Server",
+    "AsyncServer",
+    "RenderProcess",
     "api_pb2",
     "api_pb2_grpc",
     "ShowShotsServiceHandler",
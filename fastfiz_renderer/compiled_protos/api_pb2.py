@@ -15,7 +15,7 @@ _sym_db = _symbol_database.Default()
 from google.protobuf import empty_pb2 as google_dot_protobuf_dot_empty__pb2
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\tapi.proto\x12\x08protobuf\x1a\x1bgoogle/protobuf/empty.proto\"[\n\x10ShowShotsRequest\x12(\n\ntableState\x18\x01 \x02(\x0b\x32\x14.protobuf.TableState\x12\x1d\n\x05shots\x18\x02 \x03(\x0b\x32\x0e.protobuf.Shot\"1\n\x10ShowGamesRequest\x12\x1d\n\x05games\x18\x01 \x03(\x0b\x32\x0e.protobuf.Game\"/\n\x04Game\x12\'\n\x0bturnHistory\x18\x01 \x03(\x0b\x32\x12.protobuf.GameTurn\"\xc8\x01\n\x08GameTurn\x12\x10\n\x08turnType\x18\x01 \x02(\t\x12\x11\n\tagentName\x18\x02 \x02(\t\x12.\n\x10tableStateBefore\x18\x03 \x02(\x0b\x32\x14.protobuf.TableState\x12-\n\x0ftableStateAfter\x18\x04 \x02(\x0b\x32\x14.protobuf.TableState\x12$\n\x08gameShot\x18\x05 \x02(\x0b\x32\x12.protobuf.GameShot\x12\x12\n\nshotResult\x18\x06 \x02(\t\"\x91\x01\n\x08GameShot\x12(\n\nshotParams\x18\x01 \x02(\x0b\x32\x14.protobuf.ShotParams\x12\x10\n\x08\x64\x65\x63ision\x18\x02 \x02(\t\x12\x12\n\nballTarget\x18\x03 \x02(\t\x12\x14\n\x0cpocketTarget\x18\x04 \x02(\t\x12\x1f\n\x06\x63uePos\x18\x05 \x02(\x0b\x32\x0f.protobuf.Point\"I\n\nShotParams\x12\t\n\x01\x61\x18\x01 \x02(\x01\x12\t\n\x01\x62\x18\x02 \x02(\x01\x12\x0b\n\x03phi\x18\x03 \x02(\x01\x12\r\n\x05theta\x18\x04 \x02(\x01\x12\t\n\x01v\x18\x05 \x02(\x01\"+\n\nTableState\x12\x1d\n\x05\x62\x61lls\x18\x01 \x03(\x0b\x32\x0e.protobuf.Ball\"C\n\x04\x42\x61ll\x12\x1c\n\x03pos\x18\x01 \x02(\x0b\x32\x0f.protobuf.Point\x12\x0e\n\x06number\x18\x02 \x02(\x05\x12\r\n\x05state\x18\x03 \x02(\x05\"\x1d\n\x05Point\x12\t\n\x01x\x18\x01 \x02(\x01\x12\t\n\x01y\x18\x02 \x02(\x01\"\x95\x02\n\x04Shot\x12 \n\x04type\x18\x01 \x02(\x0e\x32\x12.protobuf.ShotType\x12\x1c\n\x04next\x18\x02 \x01(\x0b\x32\x0e.protobuf.Shot\x12\x1e\n\x06\x62ranch\x18\x03 \x01(\x0b\x32\x0e.protobuf.Shot\x12\x1e\n\x05posB1\x18\x04 \x01(\x0b\x32\x0f.protobuf.Point\x12\"\n\tghostBall\x18\x05 \x01(\x0b\x32\x0f.protobuf.Point\x12!\n\x08leftMost\x18\x06 \x01(\x0b\x32\x0f.protobuf.Point\x12\"\n\trightMost\x18\x07 \x01(\x0b\x32\x0f.protobuf.Point\x12\n\n\x02\x62\x31\x18\x08 \x01(\x05\x12\n\n\x02\x62\x32\x18\t \x01(\x05\x12\n\n\x02id\x18\n \x02(\x05*j\n\x08ShotType\x12\x0e\n\nCUE_STRIKE\x10\x00\x12\n\n\x06POCKET\x10\x01\x12\x08\n\x04RAIL\x10\x02\x12\n\n\x06STRIKE\x10\x03\x12\r\n\tKISS_LEFT\x10\x04\x12\x0e\n\nKISS_RIGHT\x10\x05\x12\r\n\tBALL_BOTH\x10\x06\x32\x94\x01\n\x0c\x43ueCanvasAPI\x12\x41\n\tShowShots\x12\x1a.protobuf.ShowShotsRequest\x1a\x16.google.protobuf.Empty\"\x00\x12\x41\n\tShowGames\x12\x1a.protobuf.ShowGamesRequest\x1a\x16.google.protobuf.Empty\"\x00\x42$\n\x15org.CueCraft.protobufB\tApiProtosP\x01')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\tapi.proto\x12\x08protobuf\x1a\x1bgoogle/protobuf/empty.proto\"\x91\x01\n\x10ShowShotsRequest\x12(\n\ntableState\x18\x01 \x02(\x0b\x32\x14.protobuf.TableState\x12\x1d\n\x05shots\x18\x02 \x03(\x0b\x32\x0e.protobuf.Shot\x12\x34\n\x10packedTableState\x18\x03 \x01(\x0b\x32\x1a.protobuf.PackedTableState\"1\n\x10ShowGamesRequest\x12\x1d\n\x05games\x18\x01 \x03(\x0b\x32\x0e.protobuf.Game\"e\n\x12StreamGamesRequest\x12\x1c\n\x04game\x18\x01 \x01(\x0b\x32\x0e.protobuf.Game\x12 \n\x04turn\x18\x02 \x01(\x0b\x32\x12.protobuf.GameTurn\x12\x0f\n\x07\x65ndGame\x18\x03 \x01(\x08\"\'\n\x0eStreamGamesAck\x12\x15\n\racceptedGames\x18\x01 \x02(\x05\"D\n\x0fLiveTurnRequest\x12 \n\x04turn\x18\x01 \x02(\x0b\x32\x12.protobuf.GameTurn\x12\x0f\n\x07newGame\x18\x02 \x01(\x08\"]\n\x04Game\x12\'\n\x0bturnHistory\x18\x01 \x03(\x0b\x32\x12.protobuf.GameTurn\x12,\n\x08keyframe\x18\x02 \x01(\x0b\x32\x1a.protobuf.PackedTableState\"\xef\x02\n\x08GameTurn\x12\x10\n\x08turnType\x18\x01 \x02(\t\x12\x11\n\tagentName\x18\x02 \x02(\t\x12.\n\x10tableStateBefore\x18\x03 \x02(\x0b\x32\x14.protobuf.TableState\x12-\n\x0ftableStateAfter\x18\x04 \x02(\x0b\x32\x14.protobuf.TableState\x12$\n\x08gameShot\x18\x05 \x02(\x0b\x32\x12.protobuf.GameShot\x12\x12\n\nshotResult\x18\x06 \x02(\t\x12:\n\x16packedTableStateBefore\x18\x07 \x01(\x0b\x32\x1a.protobuf.PackedTableState\x12\x39\n\x15packedTableStateAfter\x18\x08 \x01(\x0b\x32\x1a.protobuf.PackedTableState\x12.\n\nafterDelta\x18\t \x01(\x0b\x32\x1a.protobuf.PackedTableState\"\x91\x01\n\x08GameShot\x12(\n\nshotParams\x18\x01 \x02(\x0b\x32\x14.protobuf.ShotParams\x12\x10\n\x08\x64\x65\x63ision\x18\x02 \x02(\t\x12\x12\n\nballTarget\x18\x03 \x02(\t\x12\x14\n\x0cpocketTarget\x18\x04 \x02(\t\x12\x1f\n\x06\x63uePos\x18\x05 \x02(\x0b\x32\x0f.protobuf.Point\"I\n\nShotParams\x12\t\n\x01\x61\x18\x01 \x02(\x01\x12\t\n\x01\x62\x18\x02 \x02(\x01\x12\x0b\n\x03phi\x18\x03 \x02(\x01\x12\r\n\x05theta\x18\x04 \x02(\x01\x12\t\n\x01v\x18\x05 \x02(\x01\"+\n\nTableState\x12\x1d\n\x05\x62\x61lls\x18\x01 \x03(\x0b\x32\x0e.protobuf.Ball\"R\n\x10PackedTableState\x12\x13\n\x07numbers\x18\x01 \x03(\x05\x42\x02\x10\x01\x12\x12\n\x06states\x18\x02 \x03(\x05\x42\x02\x10\x01\x12\x15\n\tpositions\x18\x03 \x03(\x01\x42\x02\x10\x01\"C\n\x04\x42\x61ll\x12\x1c\n\x03pos\x18\x01 \x02(\x0b\x32\x0f.protobuf.Point\x12\x0e\n\x06number\x18\x02 \x02(\x05\x12\r\n\x05state\x18\x03 \x02(\x05\"\x1d\n\x05Point\x12\t\n\x01x\x18\x01 \x02(\x01\x12\t\n\x01y\x18\x02 \x02(\x01\"\x95\x02\n\x04Shot\x12 \n\x04type\x18\x01 \x02(\x0e\x32\x12.protobuf.ShotType\x12\x1c\n\x04next\x18\x02 \x01(\x0b\x32\x0e.protobuf.Shot\x12\x1e\n\x06\x62ranch\x18\x03 \x01(\x0b\x32\x0e.protobuf.Shot\x12\x1e\n\x05posB1\x18\x04 \x01(\x0b\x32\x0f.protobuf.Point\x12\"\n\tghostBall\x18\x05 \x01(\x0b\x32\x0f.protobuf.Point\x12!\n\x08leftMost\x18\x06 \x01(\x0b\x32\x0f.protobuf.Point\x12\"\n\trightMost\x18\x07 \x01(\x0b\x32\x0f.protobuf.Point\x12\n\n\x02\x62\x31\x18\x08 \x01(\x05\x12\n\n\x02\x62\x32\x18\t \x01(\x05\x12\n\n\x02id\x18\n \x02(\x05*j\n\x08ShotType\x12\x0e\n\nCUE_STRIKE\x10\x00\x12\n\n\x06POCKET\x10\x01\x12\x08\n\x04RAIL\x10\x02\x12\n\n\x06STRIKE\x10\x03\x12\r\n\tKISS_LEFT\x10\x04\x12\x0e\n\nKISS_RIGHT\x10\x05\x12\r\n\tBALL_BOTH\x10\x06\x32\xa9\x02\n\x0c\x43ueCanvasAPI\x12\x41\n\tShowShots\x12\x1a.protobuf.ShowShotsRequest\x1a\x16.google.protobuf.Empty\"\x00\x12\x41\n\tShowGames\x12\x1a.protobuf.ShowGamesRequest\x1a\x16.google.protobuf.Empty\"\x00\x12K\n\x0bStreamGames\x12\x1c.protobuf.StreamGamesRequest\x1a\x18.protobuf.StreamGamesAck\"\x00(\x01\x30\x01\x12\x46\n\rShowLiveTurns\x12\x19.protobuf.LiveTurnRequest\x1a\x16.google.protobuf.Empty\"\x00(\x01\x42$\n\x15org.CueCraft.protobufB\tApiProtosP\x01')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -23,28 +23,42 @@ _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'api_pb2', _globals)
 if _descriptor._USE_C_DESCRIPTORS == False:
   _globals['DESCRIPTOR']._options = None
   _globals['DESCRIPTOR']._serialized_options = b'\n\025org.CueCraft.protobufB\tApiProtosP\001'
-  _globals['_SHOTTYPE']._serialized_start=1096
-  _globals['_SHOTTYPE']._serialized_end=1202
-  _globals['_SHOWSHOTSREQUEST']._serialized_start=52
-  _globals['_SHOWSHOTSREQUEST']._serialized_end=143
-  _globals['_SHOWGAMESREQUEST']._serialized_start=145
-  _globals['_SHOWGAMESREQUEST']._serialized_end=194
-  _globals['_GAME']._serialized_start=196
-  _globals['_GAME']._serialized_end=243
-  _globals['_GAMETURN']._serialized_start=246
-  _globals['_GAMETURN']._serialized_end=446
-  _globals['_GAMESHOT']._serialized_start=449
-  _globals['_GAMESHOT']._serialized_end=594
-  _globals['_SHOTPARAMS']._serialized_start=596
-  _globals['_SHOTPARAMS']._serialized_end=669
-  _globals['_TABLESTATE']._serialized_start=671
-  _globals['_TABLESTATE']._serialized_end=714
-  _globals['_BALL']._serialized_start=716
-  _globals['_BALL']._serialized_end=783
-  _globals['_POINT']._serialized_start=785
-  _globals['_POINT']._serialized_end=814
-  _globals['_SHOT']._serialized_start=817
-  _globals['_SHOT']._serialized_end=1094
-  _globals['_CUECANVASAPI']._serialized_start=1205
-  _globals['_CUECANVASAPI']._serialized_end=1353
+  _globals['_PACKEDTABLESTATE'].fields_by_name['numbers']._options = None
+  _globals['_PACKEDTABLESTATE'].fields_by_name['numbers']._serialized_options = b'\020\001'
+  _globals['_PACKEDTABLESTATE'].fields_by_name['states']._options = None
+  _globals['_PACKEDTABLESTATE'].fields_by_name['states']._serialized_options = b'\020\001'
+  _globals['_PACKEDTABLESTATE'].fields_by_name['positions']._options = None
+  _globals['_PACKEDTABLESTATE'].fields_by_name['positions']._serialized_options = b'\020\001'
+  _globals['_SHOTTYPE']._serialized_start=1662
+  _globals['_SHOTTYPE']._serialized_end=1768
+  _globals['_SHOWSHOTSREQUEST']._serialized_start=53
+  _globals['_SHOWSHOTSREQUEST']._serialized_end=198
+  _globals['_SHOWGAMESREQUEST']._serialized_start=200
+  _globals['_SHOWGAMESREQUEST']._serialized_end=249
+  _globals['_STREAMGAMESREQUEST']._serialized_start=251
+  _globals['_STREAMGAMESREQUEST']._serialized_end=352
+  _globals['_STREAMGAMESACK']._serialized_start=354
+  _globals['_STREAMGAMESACK']._serialized_end=393
+  _globals['_LIVETURNREQUEST']._serialized_start=395
+  _globals['_LIVETURNREQUEST']._serialized_end=463
+  _globals['_GAME']._serialized_start=465
+  _globals['_GAME']._serialized_end=558
+  _globals['_GAMETURN']._serialized_start=561
+  _globals['_GAMETURN']._serialized_end=928
+  _globals['_GAMESHOT']._serialized_start=931
+  _globals['_GAMESHOT']._serialized_end=1076
+  _globals['_SHOTPARAMS']._serialized_start=1078
+  _globals['_SHOTPARAMS']._serialized_end=1151
+  _globals['_TABLESTATE']._serialized_start=1153
+  _globals['_TABLESTATE']._serialized_end=1196
+  _globals['_PACKEDTABLESTATE']._serialized_start=1198
+  _globals['_PACKEDTABLESTATE']._serialized_end=1280
+  _globals['_BALL']._serialized_start=1282
+  _globals['_BALL']._serialized_end=1349
+  _globals['_POINT']._serialized_start=1351
+  _globals['_POINT']._serialized_end=1380
+  _globals['_SHOT']._serialized_start=1383
+  _globals['_SHOT']._serialized_end=1660
+  _globals['_CUECANVASAPI']._serialized_start=1771
+  _globals['_CUECANVASAPI']._serialized_end=2068
 # @@protoc_insertion_point(module_scope)
@@ -25,12 +25,14 @@ KISS_RIGHT: ShotType
 BALL_BOTH: ShotType
 
 class ShowShotsRequest(_message.Message):
-    __slots__ = ("tableState", "shots")
+    __slots__ = ("tableState", "shots", "packedTableState")
     TABLESTATE_FIELD_NUMBER: _ClassVar[int]
     SHOTS_FIELD_NUMBER: _ClassVar[int]
+    PACKEDTABLESTATE_FIELD_NUMBER: _ClassVar[int]
     tableState: TableState
     shots: _containers.RepeatedCompositeFieldContainer[Shot]
-    def __init__(self, tableState: _Optional[_Union[TableState, _Mapping]] = ..., shots: _Optional[_Iterable[_Union[Shot, _Mapping]]] = ...) -> None: ...
+    packedTableState: PackedTableState
+    def __init__(self, tableState: _Optional[_Union[TableState, _Mapping]] = ..., shots: _Optional[_Iterable[_Union[Shot, _Mapping]]] = ..., packedTableState: _Optional[_Union[PackedTableState, _Mapping]] = ...) -> None: ...
 
 class ShowGamesRequest(_message.Message):
     __slots__ = ("games",)
@@ -38,27 +40,59 @@ class ShowGamesRequest(_message.Message):
     games: _containers.RepeatedCompositeFieldContainer[Game]
     def __init__(self, games: _Optional[_Iterable[_Union[Game, _Mapping]]] = ...) -> None: ...
 
+class StreamGamesRequest(_message.Message):
+    __slots__ = ("game", "turn", "endGame")
+    GAME_FIELD_NUMBER: _ClassVar[int]
+    TURN_FIELD_NUMBER: _ClassVar[int]
+    ENDGAME_FIELD_NUMBER: _ClassVar[int]
+    game: Game
+    turn: GameTurn
+    endGame: bool
+    def __init__(self, game: _Optional[_Union[Game, _Mapping]] = ..., turn: _Optional[_Union[GameTurn, _Mapping]] = ..., endGame: bool = ...) -> None: ...
+
+class StreamGamesAck(_message.Message):
+    __slots__ = ("acceptedGames",)
+    ACCEPTEDGAMES_FIELD_NUMBER: _ClassVar[int]
+    acceptedGames: int
+    def __init__(self, acceptedGames: _Optional[int] = ...) -> None: ...
+
+class LiveTurnRequest(_message.Message):
+    __slots__ = ("turn", "newGame")
+    TURN_FIELD_NUMBER: _ClassVar[int]
+    NEWGAME_FIELD_NUMBER: _ClassVar[int]
+    turn: GameTurn
+    newGame: bool
+    def __init__(self, turn: _Optional[_Union[GameTurn, _Mapping]] = ..., newGame: bool = ...) -> None: ...
+
 class Game(_message.Message):
-    __slots__ = ("turnHistory",)
+    __slots__ = ("turnHistory", "keyframe")
     TURNHISTORY_FIELD_NUMBER: _ClassVar[int]
+    KEYFRAME_FIELD_NUMBER: _ClassVar[int]
     turnHistory: _containers.RepeatedCompositeFieldContainer[GameTurn]
-    def __init__(self, turnHistory: _Optional[_Iterable[_Union[GameTurn, _Mapping]]] = ...) -> None: ...
+    keyframe: PackedTableState
+    def __init__(self, turnHistory: _Optional[_Iterable[_Union[GameTurn, _Mapping]]] = ..., keyframe: _Optional[_Union[PackedTableState, _Mapping]] = ...) -> None: ...
 
 class GameTurn(_message.Message):
-    __slots__ = ("turnType", "agentName", "tableStateBefore", "tableStateAfter", "gameShot", "shotResult")
+    __slots__ = ("turnType", "agentName", "tableStateBefore", "tableStateAfter", "gameShot", "shotResult", "packedTableStateBefore", "packedTableStateAfter", "afterDelta")
     TURNTYPE_FIELD_NUMBER: _ClassVar[int]
     AGENTNAME_FIELD_NUMBER: _ClassVar[int]
     TABLESTATEBEFORE_FIELD_NUMBER: _ClassVar[int]
     TABLESTATEAFTER_FIELD_NUMBER: _ClassVar[int]
     GAMESHOT_FIELD_NUMBER: _ClassVar[int]
     SHOTRESULT_FIELD_NUMBER: _ClassVar[int]
+    PACKEDTABLESTATEBEFORE_FIELD_NUMBER: _ClassVar[int]
+    PACKEDTABLESTATEAFTER_FIELD_NUMBER: _ClassVar[int]
+    AFTERDELTA_FIELD_NUMBER: _ClassVar[int]
     turnType: str
     agentName: str
     tableStateBefore: TableState
     tableStateAfter: TableState
     gameShot: GameShot
     shotResult: str
-    def __init__(self, turnType: _Optional[str] = ..., agentName: _Optional[str] = ..., tableStateBefore: _Optional[_Union[TableState, _Mapping]] = ..., tableStateAfter: _Optional[_Union[TableState, _Mapping]] = ..., gameShot: _Optional[_Union[GameShot, _Mapping]] = ..., shotResult: _Optional[str] = ...) -> None: ...
+    packedTableStateBefore: PackedTableState
+    packedTableStateAfter: PackedTableState
+    afterDelta: PackedTableState
+    def __init__(self, turnType: _Optional[str] = ..., agentName: _Optional[str] = ..., tableStateBefore: _Optional[_Union[TableState, _Mapping]] = ..., tableStateAfter: _Optional[_Union[TableState, _Mapping]] = ..., gameShot: _Optional[_Union[GameShot, _Mapping]] = ..., shotResult: _Optional[str] = ..., packedTableStateBefore: _Optional[_Union[PackedTableState, _Mapping]] = ..., packedTableStateAfter: _Optional[_Union[PackedTableState, _Mapping]] = ..., afterDelta: _Optional[_Union[PackedTableState, _Mapping]] = ...) -> None: ...
 
 class GameShot(_message.Message):
     __slots__ = ("shotParams", "decision", "ballTarget", "pocketTarget", "cuePos")
@@ -94,6 +128,16 @@ class TableState(_message.Message):
     balls: _containers.RepeatedCompositeFieldContainer[Ball]
     def __init__(self, balls: _Optional[_Iterable[_Union[Ball, _Mapping]]] = ...) -> None: ...
 
+class PackedTableState(_message.Message):
+    __slots__ = ("numbers", "states", "positions")
+    NUMBERS_FIELD_NUMBER: _ClassVar[int]
+    STATES_FIELD_NUMBER: _ClassVar[int]
+    POSITIONS_FIELD_NUMBER: _ClassVar[int]
+    numbers: _containers.RepeatedScalarFieldContainer[int]
+    states: _containers.RepeatedScalarFieldContainer[int]
+    positions: _containers.RepeatedScalarFieldContainer[float]
+    def __init__(self, numbers: _Optional[_Iterable[int]] = ..., states: _Optional[_Iterable[int]] = ..., positions: _Optional[_Iterable[float]] = ...) -> None: ...
+
 class Ball(_message.Message):
     __slots__ = ("pos", "number", "state")
     POS_FIELD_NUMBER: _ClassVar[int]
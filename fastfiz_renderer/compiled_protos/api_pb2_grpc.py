@@ -25,6 +25,16 @@ class CueCanvasAPIStub(object):
                 request_serializer=api__pb2.ShowGamesRequest.SerializeToString,
                 response_deserializer=google_dot_protobuf_dot_empty__pb2.Empty.FromString,
                 )
+        self.StreamGames = channel.stream_stream(
+                '/protobuf.CueCanvasAPI/StreamGames',
+                request_serializer=api__pb2.StreamGamesRequest.SerializeToString,
+                response_deserializer=api__pb2.StreamGamesAck.FromString,
+                )
+        self.ShowLiveTurns = channel.stream_unary(
+                '/protobuf.CueCanvasAPI/ShowLiveTurns',
+                request_serializer=api__pb2.LiveTurnRequest.SerializeToString,
+                response_deserializer=google_dot_protobuf_dot_empty__pb2.Empty.FromString,
+                )
 
 
 class CueCanvasAPIServicer(object):
@@ -42,6 +52,18 @@ class CueCanvasAPIServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def StreamGames(self, request_iterator, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ShowLiveTurns(self, request_iterator, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_CueCanvasAPIServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -55,6 +77,16 @@ def add_CueCanvasAPIServicer_to_server(servicer, server):
                     request_deserializer=api__pb2.ShowGamesRequest.FromString,
                     response_serializer=google_dot_protobuf_dot_empty__pb2.Empty.SerializeToString,
             ),
+            'StreamGames': grpc.stream_stream_rpc_method_handler(
+                    servicer.StreamGames,
+                    request_deserializer=api__pb2.StreamGamesRequest.FromString,
+                    response_serializer=api__pb2.StreamGamesAck.SerializeToString,
+            ),
+            'ShowLiveTurns': grpc.stream_unary_rpc_method_handler(
+                    servicer.ShowLiveTurns,
+                    request_deserializer=api__pb2.LiveTurnRequest.FromString,
+                    response_serializer=google_dot_protobuf_dot_empty__pb2.Empty.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'protobuf.CueCanvasAPI', rpc_method_handlers)
@@ -98,3 +130,37 @@ class CueCanvasAPI(object):
             google_dot_protobuf_dot_empty__pb2.Empty.FromString,
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def StreamGames(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_stream(request_iterator, target, '/protobuf.CueCanvasAPI/StreamGames',
+            api__pb2.StreamGamesRequest.SerializeToString,
+            api__pb2.StreamGamesAck.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def ShowLiveTurns(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_unary(request_iterator, target, '/protobuf.CueCanvasAPI/ShowLiveTurns',
+            api__pb2.LiveTurnRequest.SerializeToString,
+            google_dot_protobuf_dot_empty__pb2.Empty.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)